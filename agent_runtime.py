@@ -0,0 +1,149 @@
+"""
+投資分析 Agent 的執行層
+
+- run_tools_concurrently：互不相依的工具 (股價 / K 線 / 新聞 / 財報) 同時以 thread pool 執行，
+  每個工具有各自的 timeout，總耗時趨近於最慢的那一個，而不是全部相加。
+- StreamingStepHandler：LangChain callback，把中間步驟、工具耗時與最終答案即時寫到畫面上的 placeholder。
+
+本模組不直接依賴 streamlit，placeholder 只要有 .markdown(text) 即可，方便離線測試與 benchmark。
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # 舊版 langchain
+    from langchain.callbacks.base import BaseCallbackHandler
+
+DEFAULT_TOOL_TIMEOUT = 20.0
+
+
+@dataclass
+class ToolCall:
+    name: str
+    func: object
+    arg: str
+    timeout: float = DEFAULT_TOOL_TIMEOUT
+
+
+@dataclass
+class ToolResult:
+    name: str
+    arg: str
+    output: object = None
+    error: str = None
+    timed_out: bool = False
+    latency: float = 0.0
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+    def as_text(self):
+        if self.timed_out:
+            return f"(逾時 {self.latency:.1f}s，未取得資料)"
+        if self.error:
+            return f"(執行失敗: {self.error})"
+        return str(self.output)
+
+
+def run_tools_concurrently(calls, max_workers=None, on_result=None):
+    """
+    並行執行多個工具呼叫，依原始順序回傳 ToolResult。
+    on_result(result) 會在「呼叫端執行緒」中依完成順序觸發，可安全地更新 UI。
+    逾時的工具無法強制中止，背景執行緒會自行結束，但結果會被丟棄。
+    """
+    if not calls:
+        return []
+
+    results = [None] * len(calls)
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(calls))
+    start = time.perf_counter()
+    pending = {}
+    for idx, call in enumerate(calls):
+        pending[executor.submit(_timed_call, call)] = idx
+
+    try:
+        while pending:
+            now = time.perf_counter() - start
+            next_deadline = min(calls[i].timeout for i in pending.values()) - now
+            done, _ = wait(pending, timeout=max(next_deadline, 0), return_when=FIRST_COMPLETED)
+
+            for fut in done:
+                idx = pending.pop(fut)
+                results[idx] = fut.result()
+                if on_result: on_result(results[idx])
+
+            elapsed = time.perf_counter() - start
+            for fut, idx in list(pending.items()):
+                if elapsed >= calls[idx].timeout:
+                    del pending[fut]
+                    fut.cancel()
+                    results[idx] = ToolResult(calls[idx].name, calls[idx].arg, timed_out=True, latency=elapsed)
+                    if on_result: on_result(results[idx])
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def _timed_call(call):
+    t0 = time.perf_counter()
+    try:
+        output = call.func(call.arg)
+        return ToolResult(call.name, call.arg, output=output, latency=time.perf_counter() - t0)
+    except Exception as e:
+        return ToolResult(call.name, call.arg, error=str(e), latency=time.perf_counter() - t0)
+
+
+class StreamingStepHandler(BaseCallbackHandler):
+    """
+    把 Agent 的中間步驟與 LLM token 串流到 placeholder。
+    stream_tokens=False 時只顯示步驟 (ReAct agent 的原始輸出含 JSON action，不適合直接顯示)。
+    每個工具的耗時記錄在 tool_latency：[(工具名稱, 秒數), ...]
+    """
+
+    def __init__(self, placeholder, stream_tokens=True):
+        self.placeholder = placeholder
+        self.stream_tokens = stream_tokens
+        self.steps = []
+        self.text = ""
+        self.tool_latency = []
+        self._tool_start = {}
+
+    def _render(self, cursor=True):
+        body = "\n".join(self.steps)
+        if self.text:
+            body = f"{body}\n\n{self.text}" if body else self.text
+        self.placeholder.markdown(body + (" ▌" if cursor else ""))
+
+    def add_step(self, line):
+        self.steps.append(line)
+        self._render()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if not self.stream_tokens: return
+        self.text += token
+        self._render()
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, **kwargs):
+        name = (serialized or {}).get("name", "tool")
+        self._tool_start[run_id] = (name, time.perf_counter())
+        self.add_step(f"🔧 `{name}` ← {str(input_str)[:60]}")
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        name, t0 = self._tool_start.pop(run_id, ("tool", time.perf_counter()))
+        latency = time.perf_counter() - t0
+        self.tool_latency.append((name, latency))
+        self.add_step(f"✅ `{name}` 完成 ({latency:.2f}s)")
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        name, t0 = self._tool_start.pop(run_id, ("tool", time.perf_counter()))
+        latency = time.perf_counter() - t0
+        self.tool_latency.append((name, latency))
+        self.add_step(f"⚠️ `{name}` 失敗 ({latency:.2f}s): {error}")
+
+    def on_agent_finish(self, finish, **kwargs):
+        self.text = finish.return_values.get("output", self.text)
+        self._render(cursor=False)
@@ -1,10 +1,8 @@
 import streamlit as st
 import os
 import sys
-import tempfile
+import time
 import uuid
-import pandas as pd
-import plotly.graph_objects as go # 🌟 繪圖神器
 
 # ================= 1. 雲端資料庫修正 =================
 try:
@@ -26,21 +24,12 @@ st.title("📈 AI 智能投資分析師")
 st.caption("🚀 雙引擎架構：Google Gemini + Groq | 支援 K 線圖繪製與財報分析")
 
 # ================= 3. 匯入必要套件 =================
+# langchain / FastEmbed / Chroma / yfinance / plotly 都很重，改成用到時才 import (見 lazy_deps.py)，
+# 冷啟動只載入畫面需要的輕量模組。
 try:
-    import langchain
-    from langchain_google_genai import ChatGoogleGenerativeAI
-    from langchain_groq import ChatGroq
-    
-    from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
-    from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
-    from langchain_community.vectorstores import Chroma
-    from langchain.prompts import ChatPromptTemplate, PromptTemplate
-    
-    from langchain.agents import initialize_agent, AgentType, Tool
-    from langchain.chains import RetrievalQA
-    import yfinance as yf
-    from googlesearch import search as google_search
+    from lazy_deps import get_embeddings, prewarm_rag_stack
+    from collection_registry import CollectionRegistry, CollectionTooLargeError, EVICTED, EXPIRED
+    from investment_tools import extract_symbols, plan_tools, build_tools, build_agent, run_concurrent_analysis
     
 except ImportError as e:
     st.error(f"❌ 系統啟動失敗！原因: {e}")
@@ -53,73 +42,40 @@ GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY", "")
 GROQ_API_KEY = st.secrets.get("GROQ_API_KEY", "")
 
 # ================= 5. 定義工具 (Tools) =================
+# 工具、Agent 與並行分析模式實作在 investment_tools.py (不依賴 UI，benchmark 也用同一套)，
+# 這裡只負責把 K 線圖畫到畫面上。
 
-def get_stock_price_func(symbol: str):
-    """查詢股票即時數據"""
-    try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        currency = info.get('currency', 'USD')
-        price = info.get('currentPrice') or info.get('regularMarketPrice') or info.get('ask') or 'N/A'
-        pe = info.get('trailingPE', 'N/A')
-        eps = info.get('trailingEps', 'N/A')
-        return f"【{symbol}】現價: {price} {currency}, 本益比(PE): {pe}, EPS: {eps}"
-    except Exception as e:
-        return f"查詢失敗: {e}"
-
-def get_google_news_func(query: str):
-    """Google 搜尋"""
-    try:
-        results = google_search(query, num_results=3, advanced=True)
-        output_text = f"【Google 搜尋結果 - {query}】\n"
-        count = 0
-        for r in results:
-            count += 1
-            output_text += f"{count}. {r.title}\n   {r.description}\n\n"
-        if count == 0: return "未搜尋到相關結果。"
-        return output_text
-    except Exception as e:
-        return f"搜尋失敗: {e}"
+def render_chart(fig):
+    # 🌟 關鍵：直接在 Streamlit 介面顯示圖表
+    st.plotly_chart(fig, use_container_width=True)
 
-def draw_stock_kline(symbol: str):
-    """
-    繪製股票 K 線圖 (Candlestick Chart)。
-    輸入參數：股票代碼 (如 2330.TW)。
-    """
-    try:
-        # 下載最近 3 個月的歷史數據
-        df = yf.download(symbol, period="3mo", interval="1d")
-        
-        if df.empty:
-            return f"無法獲取 {symbol} 的歷史數據，無法繪圖。"
+# ================= 6. 核心邏輯 =================
 
-        # 建立 Plotly K 線圖
-        fig = go.Figure(data=[go.Candlestick(
-            x=df.index,
-            open=df['Open'],
-            high=df['High'],
-            low=df['Low'],
-            close=df['Close'],
-            name=symbol
-        )])
+@st.cache_resource
+def get_answer_cache():
+    """跨 session 共用的語意快取 (以文件集指紋分區)"""
+    from semantic_cache import SemanticAnswerCache
+    return SemanticAnswerCache(max_entries=512, threshold=0.95)
 
-        fig.update_layout(
-            title=f'{symbol} 近三個月 K 線走勢圖',
-            yaxis_title='股價',
-            xaxis_title='日期',
-            template="plotly_white",
-            height=500
-        )
-        
-        # 🌟 關鍵：直接在 Streamlit 介面顯示圖表
-        st.plotly_chart(fig, use_container_width=True)
-        
-        return f"已成功在畫面上繪製 {symbol} 的 K 線圖，請參考圖表進行趨勢分析。"
-    except Exception as e:
-        return f"繪圖失敗: {e}"
+@st.cache_resource
+def get_embedding_dim():
+    return len(get_embeddings().embed_query("維度"))
 
-# ================= 6. 核心邏輯 =================
+@st.cache_resource
+def get_collection_registry():
+    """
+    全 worker 共用的 collection 登記表：session 重置 / 閒置 1 小時即刪除，
+    全域最多 32 個 collection、約 512MB，超過時淘汰最久沒用的。
+    """
+    def on_delete(entry):
+        # 最後一個使用該文件集的 collection 被刪掉 -> 快取答案才作廢 (快取跨 session 共用)
+        if entry.fingerprint and not registry.fingerprint_in_use(entry.fingerprint):
+            get_answer_cache().invalidate(entry.fingerprint)
+    registry = CollectionRegistry(max_collections=32, max_bytes=512 * 1024 * 1024, session_ttl=3600, on_delete=on_delete)
+    return registry
 
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
 if "uploader_id" not in st.session_state:
     st.session_state.uploader_id = str(uuid.uuid4())
 if "messages" not in st.session_state:
@@ -128,13 +84,45 @@ if "vector_db" not in st.session_state:
     st.session_state.vector_db = None
 if "processed_files" not in st.session_state:
     st.session_state.processed_files = [] 
+if "doc_fingerprint" not in st.session_state:
+    st.session_state.doc_fingerprint = None
+if "collection_name" not in st.session_state:
+    st.session_state.collection_name = None
+if "index_backend" not in st.session_state:
+    st.session_state.index_backend = None
+
+def release_vector_db():
+    # 真正刪除 Chroma collection (只清 Python 參照，向量會一直留在記憶體裡)
+    get_collection_registry().release_session(st.session_state.session_id)
+    st.session_state.vector_db = None
+    st.session_state.doc_fingerprint = None
+    st.session_state.collection_name = None
 
 def nuke_reset():
+    release_vector_db()
     st.session_state.messages = []
-    st.session_state.vector_db = None
     st.session_state.processed_files = []
     st.session_state.uploader_id = str(uuid.uuid4()) 
 
+registry = get_collection_registry()
+registry.expire()
+registry.touch(st.session_state.session_id, st.session_state.collection_name)
+if st.session_state.vector_db is not None and not registry.is_alive(st.session_state.collection_name):
+    # 被全域上限淘汰或閒置逾時。換一個 uploader key 清掉已選的檔案，
+    # 否則側邊欄會在同一輪立刻重新向量化，又把下一個 session 擠掉
+    reason = registry.removal_reason(st.session_state.collection_name)
+    st.session_state.vector_db = None
+    st.session_state.doc_fingerprint = None
+    st.session_state.collection_name = None
+    st.session_state.processed_files = []
+    st.session_state.uploader_id = str(uuid.uuid4())
+    if reason == EVICTED:
+        st.warning("⚠️ 伺服器記憶體不足，先前的財報資料庫已被回收，請重新上傳文件。")
+    elif reason == EXPIRED:
+        st.warning("⚠️ 閒置超過 1 小時，先前的財報資料庫已被回收，請重新上傳文件。")
+    else:
+        st.warning("⚠️ 先前的財報資料庫已被回收，請重新上傳文件。")
+
 with st.sidebar:
     st.header("🤖 模型設定")
     model_option = st.selectbox(
@@ -142,9 +130,21 @@ with st.sidebar:
         ("Google Gemini Pro (推薦)", "Groq Llama 3.1 8B (備用)"),
         index=0
     )
+    exec_mode = st.radio(
+        "執行模式",
+        ("⚡ 並行模式 (同時呼叫工具)", "🧠 Agent 逐步推理"),
+        index=0,
+        help="並行模式只同時呼叫問題提到的工具 (問「分析」才全部呼叫)；沒有股票代碼或看不出需要哪些工具時自動改用 Agent。"
+    )
     
     st.divider()
     st.header("🗂️ 財報上傳")
+    index_backend = st.radio(
+        "向量索引",
+        ("Chroma (預設)", "精簡 int8 索引 (大量文件)"),
+        index=0,
+        help="精簡索引把向量量化成 int8 並存在磁碟 (memmap)，每個 chunk 常駐記憶體約省 4 倍，適合上傳大量季報；磁碟上另存一份 float32 向量供精確重排，總儲存量並沒有變少。"
+    )
     
     uploaded_files = st.file_uploader(
         "上傳文件", type=["pdf", "docx"], accept_multiple_files=True,
@@ -154,35 +154,45 @@ with st.sidebar:
     current_files_sig = [(f.name, f.size) for f in uploaded_files] if uploaded_files else []
     
     if uploaded_files:
-        if current_files_sig != st.session_state.processed_files:
+        if current_files_sig != st.session_state.processed_files or index_backend != st.session_state.index_backend:
             with st.spinner("🧠 讀取並向量化文件 (FastEmbed)..."):
                 try:
-                    all_splits = []
-                    for uploaded_file in uploaded_files:
-                        file_name = uploaded_file.name
-                        file_ext = os.path.splitext(file_name)[1].lower()
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
-                            tmp_file.write(uploaded_file.getvalue())
-                            tmp_path = tmp_file.name
-                        if file_ext == ".pdf": loader = PyPDFLoader(tmp_path)
-                        elif file_ext == ".docx": loader = Docx2txtLoader(tmp_path)
-                        else: continue
-                        docs = loader.load()
-                        text_splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-                        splits = text_splitter.split_documents(docs)
-                        all_splits.extend(splits)
-                        os.remove(tmp_path)
+                    from rag_pipeline import load_and_split, build_vector_store
+                    from semantic_cache import collection_fingerprint
+
+                    file_blobs = [(f.name, f.getvalue()) for f in uploaded_files]
+                    all_splits = load_and_split(file_blobs)
 
+                    compact = "int8" in index_backend
                     if all_splits:
-                        embeddings = FastEmbedEmbeddings()
+                        size_kwargs = dict(
+                            vectors=len(all_splits), dim=get_embedding_dim(),
+                            # 精簡索引的 chunk 文字留在磁碟，不算常駐記憶體
+                            text_bytes=0 if compact else sum(len(d.page_content.encode("utf-8")) for d in all_splits),
+                            bytes_per_value=1 if compact else 4
+                        )
+                        estimated = registry.estimate_bytes(**size_kwargs)
+                    if all_splits and estimated > registry.max_bytes:
+                        # 單獨就超過全域上限：不建立向量庫、不為它淘汰其他使用者；記下這批檔案避免每次 rerun 重試
+                        release_vector_db()
+                        st.session_state.processed_files = current_files_sig
+                        st.session_state.index_backend = index_backend
+                        st.error(f"❌ {CollectionTooLargeError(estimated, registry.max_bytes)}，請減少文件或改用精簡 int8 索引。")
+                    elif all_splits:
+                        embeddings = get_embeddings()
+                        fingerprint = collection_fingerprint(file_blobs, model_name=embeddings.model_name)
                         unique_collection_name = f"collection_{uuid.uuid4()}"
-                        vector_db = Chroma.from_documents(
-                            documents=all_splits, 
-                            embedding=embeddings,
-                            collection_name=unique_collection_name 
+                        vector_db = build_vector_store(all_splits, embeddings, unique_collection_name, compact=compact)
+                        # 登記新 collection，同一 session 的舊 collection 會在這裡被刪除
+                        registry.register(
+                            st.session_state.session_id, unique_collection_name, vector_db,
+                            fingerprint=fingerprint, **size_kwargs
                         )
                         st.session_state.vector_db = vector_db
+                        st.session_state.collection_name = unique_collection_name
                         st.session_state.processed_files = current_files_sig
+                        st.session_state.index_backend = index_backend
+                        st.session_state.doc_fingerprint = fingerprint
                         st.toast(f"✅ 資料庫建立完成！", icon="📚")
                     else:
                         st.warning("⚠️ 檔案內容為空")
@@ -190,10 +200,16 @@ with st.sidebar:
                     st.error(f"❌ 錯誤: {e}")
     else:
         if st.session_state.vector_db is not None:
-            st.session_state.vector_db = None
+            release_vector_db()
             st.session_state.processed_files = []
             st.rerun()
 
+    mem = registry.stats()
+    st.caption(
+        f"🧮 常駐向量庫：{mem['collections']} 個 collection ｜ "
+        f"{mem['vectors']:,} 向量 ｜ 約 {mem['bytes'] / 1024 / 1024:.1f} MB"
+    )
+
     st.markdown("") 
     if st.button("🔄 重置系統", type="primary", use_container_width=True, on_click=nuke_reset):
         pass
@@ -213,79 +229,62 @@ if prompt := st.chat_input("請輸入問題 (例如：畫出 2330.TW 的走勢
 
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
+        t_start = time.perf_counter()
         
         try:
+            from agent_runtime import StreamingStepHandler
+            from rag_pipeline import build_cached_qa
+
+            handler = StreamingStepHandler(message_placeholder, stream_tokens=False)
             llm = None
             if "Gemini" in model_option:
                 if not GOOGLE_API_KEY: st.error("❌ 缺少 GOOGLE_API_KEY"); st.stop()
                 message_placeholder.markdown("💎 Gemini 正在分析...")
+                from langchain_google_genai import ChatGoogleGenerativeAI
                 llm = ChatGoogleGenerativeAI(google_api_key=GOOGLE_API_KEY, model="gemini-pro", temperature=0.1)
             elif "Groq" in model_option:
                 if not GROQ_API_KEY: st.error("❌ 缺少 GROQ_API_KEY"); st.stop()
                 message_placeholder.markdown("⚡ Groq 正在分析...")
+                from langchain_groq import ChatGroq
                 llm = ChatGroq(groq_api_key=GROQ_API_KEY, model_name="llama-3.1-8b-instant", temperature=0.1)
 
-            # 🌟 定義工具箱
-            tools = [
-                Tool(
-                    name="Stock_Price",
-                    func=get_stock_price_func,
-                    description="輸入股票代碼(如 2330.TW)，查詢『即時股價、本益比、EPS』。"
-                ),
-                Tool(
-                    name="Google_Search",
-                    func=get_google_news_func,
-                    description="輸入搜尋關鍵字，查詢『最新新聞、市場動態』。"
-                ),
-                Tool(
-                    name="Draw_Kline_Chart",
-                    func=draw_stock_kline,
-                    description="輸入股票代碼(如 2330.TW)，『繪製 K 線圖』並顯示在畫面上。"
-                )
-            ]
-            
+            cached_qa = None
             if st.session_state.vector_db:
-                qa = RetrievalQA.from_chain_type(
-                    llm=llm,
-                    retriever=st.session_state.vector_db.as_retriever(search_kwargs={"k": 5})
-                )
-                tools.append(
-                    Tool(
-                        name="Financial_Report_RAG",
-                        func=qa.run,
-                        description="用於查詢使用者上傳的財報、PDF 文件內容。"
-                    )
+                # 🌟 語意快取：相似問題直接回傳先前答案，省去檢索 + LLM
+                cached_qa = build_cached_qa(
+                    llm, st.session_state.vector_db, get_embeddings(), get_answer_cache(),
+                    st.session_state.doc_fingerprint
                 )
+            rag_func = cached_qa.run if cached_qa else None
 
-            # 🌟 Agent 指令設定 (System Prompt)
-            agent_prefix = """
-            你是一個專業的華爾街投資顧問。你的任務是綜合利用多種工具來回答使用者的投資問題。
-            
-            【你的工具箱】：
-            1. Stock_Price: 查即時股價、PE、EPS。
-            2. Draw_Kline_Chart: 當使用者提到「走勢圖」、「K線」、「畫圖」時，務必使用此工具。
-            3. Google_Search: 查最近的新聞利多/利空。
-            4. Financial_Report_RAG: (若有上傳文件) 查財報細節。
-
-            【回答策略】：
-            - 必須先調用工具獲取真實數據，不要憑空猜測。
-            - 若使用者要求畫圖，請優先調用 Draw_Kline_Chart。
-            - 最後請根據 股價表現 + 技術面(K線) + 基本面(財報) + 消息面(新聞) 給出綜合投資建議 (Buy/Hold/Sell)。
-            """
-
-            agent = initialize_agent(
-                tools, 
-                llm, 
-                agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=False,
-                handle_parsing_errors=True,
-                agent_kwargs={'prefix': agent_prefix} # 注入更強的 Prompt
-            )
-            
-            response = agent.run(prompt)
+            symbols = extract_symbols(prompt) if "並行" in exec_mode else []
+            planned = plan_tools(prompt, has_rag=rag_func is not None) if symbols else []
+            if planned:
+                handler.stream_tokens = True
+                response = run_concurrent_analysis(prompt, symbols, llm, rag_func, handler, render_chart, tools=planned)
+            else:
+                agent = build_agent(llm, build_tools(rag_func, render_chart))
+                response = agent.run(prompt, callbacks=[handler])
             
             message_placeholder.markdown(response)
+            if handler.tool_latency:
+                with st.expander(f"⏱️ 工具耗時 (總計 {time.perf_counter() - t_start:.2f}s)"):
+                    for name, sec in handler.tool_latency:
+                        st.markdown(f"- `{name}`: {sec:.2f}s")
+            if cached_qa and cached_qa.last_hit:
+                st.caption(f"⚡ 財報查詢命中語意快取 (相似度 {cached_qa.last_hit.similarity:.2f})")
+            if cached_qa and cached_qa.last_sources:
+                with st.expander("📑 財報來源段落"):
+                    for i, src in enumerate(cached_qa.last_sources, 1):
+                        page = src["metadata"].get("page")
+                        label = os.path.basename(src["metadata"].get("source", ""))
+                        st.markdown(f"**{i}. {label}{f' (p.{page + 1})' if page is not None else ''}**")
+                        st.caption(src["content"][:300])
             st.session_state.messages.append({"role": "assistant", "content": response})
             
         except Exception as e:
-            st.error(f"❌ 發生錯誤: {e}")
\ No newline at end of file
+            st.error(f"❌ 發生錯誤: {e}")
+
+# ================= 背景預熱 =================
+# 畫面已送出，趁使用者閱讀 / 選檔時在背景載入嵌入模型與向量庫，上傳時就不用再等
+prewarm_rag_stack()
@@ -0,0 +1,184 @@
+"""
+精簡 int8 索引 vs. Chroma：recall / 延遲 / 記憶體 / 磁碟 benchmark
+
+以合成的「分群」向量模擬財報 chunk 的嵌入分佈 (同一主題的段落彼此相近)，
+以 float32 暴力搜尋結果為標準答案。兩種 backend 都走 app 的實際路徑：
+rag_pipeline.build_vector_store(documents, embedding, ...) 建立，再以同一個
+as_retriever(search_kwargs={"k": k}).invoke() / .batch() 查詢 (含 Document 與 metadata)。
+- chroma           : Chroma.from_documents (langchain，預設 L2 空間，in-process)
+- compact          : int8 memmap，只用量化分數
+- compact+rescore  : int8 取 shortlist 後以 float32 精確重排
+
+嵌入以預先算好的向量代替 FastEmbed (同樣輸出正規化向量)，只量索引本身。
+RAM B/chunk 為常駐記憶體；disk B/chunk 為寫到磁碟的大小 (compact 預設另存一份 float32 供重排)。
+
+用法：
+    python benchmarks/bench_compact_index.py --chunks 50000 --queries 200
+    python benchmarks/bench_compact_index.py --skip-chroma --json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from langchain_core.documents import Document  # noqa: E402
+from rag_pipeline import build_vector_store  # noqa: E402
+
+
+class PrecomputedEmbeddings:
+    """文字 -> 預先算好的正規化向量 (介面同 FastEmbedEmbeddings)"""
+
+    def __init__(self, table):
+        self.table = table
+        self.model_name = "precomputed"
+
+    def embed_documents(self, texts):
+        return [self.table[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.table[text]
+
+
+def synthetic_corpus(n, dim, topics, seed):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim)).astype(np.float32)
+    labels = rng.integers(0, topics, n)
+    vectors = centers[labels] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors, rng
+
+
+def synthetic_queries(vectors, rng, m):
+    picks = rng.integers(0, len(vectors), m)
+    return vectors[picks] + 0.4 * rng.normal(size=(m, vectors.shape[1])).astype(np.float32)
+
+
+def exact_topk(vectors, queries, k):
+    X = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    Q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    out = []
+    for start in range(0, len(Q), 64):
+        scores = Q[start:start + 64] @ X.T
+        out.extend(np.argsort(-scores, axis=1)[:, :k])
+    return out
+
+
+def recall(truth, found, k):
+    return statistics.mean(len(set(t[:k]) & set(f[:k])) / k for t, f in zip(truth, found))
+
+
+def percentile(samples, p):
+    return float(np.percentile(np.asarray(samples), p)) * 1000
+
+
+def _corpus(vectors, queries):
+    unit = lambda x: (x / np.linalg.norm(x, axis=1, keepdims=True)).tolist()
+    doc_texts = [f"chunk {i}" for i in range(len(vectors))]
+    query_texts = [f"query {j}" for j in range(len(queries))]
+    table = dict(zip(doc_texts, unit(vectors)))
+    table.update(zip(query_texts, unit(queries)))
+    docs = [Document(page_content=t, metadata={"chunk": i}) for i, t in enumerate(doc_texts)]
+    return docs, query_texts, PrecomputedEmbeddings(table)
+
+
+def _dir_bytes(directory):
+    return sum(f.stat().st_size for f in Path(directory).rglob("*") if f.is_file())
+
+
+def bench_backend(vectors, queries, k, compact, rescore=True):
+    docs, query_texts, embeddings = _corpus(vectors, queries)
+    t0 = time.perf_counter()
+    store = build_vector_store(docs, embeddings, f"bench_{uuid.uuid4()}", compact=compact)
+    build = time.perf_counter() - t0
+    retriever = store.as_retriever(search_kwargs={"k": k}, **({"rescore": rescore} if compact else {}))
+
+    latencies, found = [], []
+    for q in query_texts:
+        t = time.perf_counter()
+        hits = retriever.invoke(q)
+        latencies.append(time.perf_counter() - t)
+        found.append([d.metadata["chunk"] for d in hits])
+
+    t = time.perf_counter()
+    retriever.batch(query_texts)
+    batched = time.perf_counter() - t
+
+    if compact:
+        stats = store.stats()
+        ram = stats["resident_bytes"]
+        disk = _dir_bytes(store.directory)
+    else:
+        # in-process Chroma：只計 float32 向量本身，HNSW 圖、文件與 SQLite 的額外開銷未計入；不寫磁碟
+        ram = vectors.shape[1] * 4 * len(vectors)
+        disk = 0
+    store.delete_collection()
+    return {
+        "build_s": build,
+        "found": found,
+        "latencies": latencies,
+        "batched_qps": len(queries) / batched,
+        "ram_bytes_per_chunk": ram / len(vectors),
+        "disk_bytes_per_chunk": disk / len(vectors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="精簡 int8 索引 vs. Chroma benchmark")
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384, help="FastEmbed 預設模型 (bge-small) 為 384 維")
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-chroma", action="store_true")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    vectors, rng = synthetic_corpus(args.chunks, args.dim, args.topics, args.seed)
+    queries = synthetic_queries(vectors, rng, args.queries)
+    truth = exact_topk(vectors, queries, args.k)
+
+    runs = {
+        "compact": bench_backend(vectors, queries, args.k, compact=True, rescore=False),
+        "compact+rescore": bench_backend(vectors, queries, args.k, compact=True, rescore=True),
+    }
+    if not args.skip_chroma:
+        try:
+            runs["chroma"] = bench_backend(vectors, queries, args.k, compact=False)
+        except ImportError:
+            print("⚠️ 未安裝 chromadb，略過 Chroma", file=sys.stderr)
+
+    report = {}
+    for name, r in runs.items():
+        report[name] = {
+            "recall@k": recall(truth, r["found"], args.k),
+            "p50_ms": percentile(r["latencies"], 50),
+            "p95_ms": percentile(r["latencies"], 95),
+            "batched_qps": r["batched_qps"],
+            "build_s": r["build_s"],
+            "ram_bytes_per_chunk": r["ram_bytes_per_chunk"],
+            "disk_bytes_per_chunk": r["disk_bytes_per_chunk"],
+        }
+
+    if args.json:
+        print(json.dumps({"config": vars(args), "results": report}, indent=2))
+        return
+
+    print(f"chunks={args.chunks} dim={args.dim} queries={args.queries} k={args.k}")
+    print(f"{'backend':<18}{'recall@k':>10}{'p50 ms':>10}{'p95 ms':>10}{'batch qps':>12}{'build s':>10}"
+          f"{'RAM B/chunk':>13}{'disk B/chunk':>14}")
+    for name, r in report.items():
+        print(f"{name:<18}{r['recall@k']:>10.3f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['batched_qps']:>12.0f}{r['build_s']:>10.2f}"
+              f"{r['ram_bytes_per_chunk']:>13.0f}{r['disk_bytes_per_chunk']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
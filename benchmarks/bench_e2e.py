@@ -0,0 +1,341 @@
+"""
+端到端 benchmark：不連網、不花 token，以本地假 LLM 與合成資料驅動兩個 app 的真實程式碼路徑
+
+情境 (scenario)：
+- shopai : shopai_core 的 generate_sql -> execute_sql_safe -> generate_human_response
+           (合成商品目錄 1 萬 ~ 500 萬 SKU，LLM 走 Groq SDK -> 本地假伺服器)
+- ingest : rag_pipeline 的 load_and_split -> build_vector_store (合成財報 PDF，Chroma 或 int8 精簡索引)
+- agent  : investment_tools 的並行分析模式或 structured-chat Agent (行情 / 新聞皆為合成資料)
+
+每個情境以指定的並行度送出請求，回報總吞吐量與各階段 p50 / p95 / p99。
+
+用法：
+    python benchmarks/bench_e2e.py shopai --catalog 100000 --requests 200 --concurrency 8
+    python benchmarks/bench_e2e.py ingest --files 20 --pages 10 --concurrency 4 --compact
+    python benchmarks/bench_e2e.py agent --mode concurrent --requests 40 --market-latency 0.3
+    python benchmarks/bench_e2e.py all --json > bench_output.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fixtures import (  # noqa: E402
+    HashEmbeddings, SyntheticNewsBackend, patch_market_data, synthetic_catalog, synthetic_pdf_corpus,
+)
+from stub_llm_server import StubLLMConfig, StubLLMServer  # noqa: E402
+
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+SHOPAI_QUERIES = [
+    "列出近 7 日銷量最高的前 5 名商品",
+    "列出庫存小於 7 日銷量的危險商品",
+    "列出毛利 (Price-Cost) 最高的前 5 名",
+    "統計各供應商的供貨品項數量",
+    "列出所有缺貨商品及其供應商",
+    "統計各類別的庫存總金額，並計算毛利",
+    "列出庫存低於 10 的商品與其 7 日銷量",
+]
+
+AGENT_QUESTIONS = [
+    "分析 2330.TW",
+    "畫出 2454.TW 的走勢圖並分析",
+    "比較 2317.TW 與 2303.TW 的基本面",
+    "NVDA 最近的新聞與股價表現如何？",
+]
+
+
+class StageRecorder:
+    """執行緒安全的各階段耗時紀錄"""
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._lock = threading.Lock()
+        self.errors = 0
+
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """成功才計入 name；失敗的耗時另外記在 name:error，不混進正常路徑的百分位數"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.add(f"{name}:error", time.perf_counter() - t0)
+            raise
+        self.add(name, time.perf_counter() - t0)
+
+    def summary(self):
+        out = {}
+        for stage, samples in self._samples.items():
+            arr = np.asarray(samples) * 1000
+            out[stage] = {
+                "n": len(samples),
+                "p50_ms": float(np.percentile(arr, 50)),
+                "p95_ms": float(np.percentile(arr, 95)),
+                "p99_ms": float(np.percentile(arr, 99)),
+                "mean_ms": float(arr.mean()),
+            }
+        return out
+
+
+def run_load(fn, requests, concurrency, recorder):
+    """以 concurrency 個 worker 執行 fn(i)，i = 0..requests-1；回傳 wall time (秒)"""
+    def one(i):
+        try:
+            with recorder.stage("total"):
+                fn(i)
+        except Exception as e:
+            recorder.error()
+            print(f"⚠️ request {i} 失敗: {e}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    return time.perf_counter() - t0
+
+
+def report(name, recorder, wall, requests, setup=None, extra=None):
+    result = {
+        "scenario": name,
+        "requests": requests,
+        "errors": recorder.errors,
+        "wall_s": wall,
+        # 只算成功的請求：壞掉的路徑通常比較快，不能讓它把吞吐量灌高
+        "throughput_rps": (requests - recorder.errors) / wall if wall else 0.0,
+        "stages": recorder.summary(),
+    }
+    if setup: result["setup"] = setup
+    if extra: result.update(extra)
+    return result
+
+
+def llm_config(args):
+    return StubLLMConfig(
+        latency=args.llm_latency, tokens_per_sec=args.tps,
+        completion_tokens=args.completion_tokens, sql_error_rate=args.sql_error_rate,
+    )
+
+
+# ================= 情境：ShopAI =================
+
+def bench_shopai(args):
+    import shopai_core as core
+    from groq import Groq
+
+    t0 = time.perf_counter()
+    conn = core.create_db(synthetic_catalog(args.catalog, seed=args.seed))
+    setup = {"catalog_rows": args.catalog, "catalog_build_s": time.perf_counter() - t0}
+
+    recorder = StageRecorder()
+    retries = []
+    with StubLLMServer(llm_config(args)) as server:
+        client = Groq(api_key="stub", base_url=server.base_url, max_retries=0)
+
+        def one(i):
+            query = SHOPAI_QUERIES[i % len(SHOPAI_QUERIES)]
+            with recorder.stage("generate_sql"):
+                sql = core.generate_sql(client, query)
+            result, error = None, None
+            if sql:
+                with recorder.stage("execute_sql_safe"):
+                    result, err_or_new_sql = core.execute_sql_safe(client, conn, sql, query)
+                if result is None: error = err_or_new_sql
+                elif err_or_new_sql: retries.append(i)
+            with recorder.stage("generate_human_response"):
+                core.generate_human_response(client, query, result, error)
+
+        wall = run_load(one, args.requests, args.concurrency, recorder)
+        extra = {"sql_self_corrections": len(retries), "llm_requests": server.requests}
+    return report("shopai", recorder, wall, args.requests, setup, extra)
+
+
+# ================= 情境：財報上傳 (ingestion) =================
+
+def _embeddings(args):
+    if args.real_embeddings:
+        from lazy_deps import get_embeddings
+        return get_embeddings()
+    return HashEmbeddings()
+
+
+def bench_ingest(args):
+    from rag_pipeline import load_and_split, build_vector_store
+
+    t0 = time.perf_counter()
+    corpus = synthetic_pdf_corpus(args.files, pages=args.pages, seed=args.seed)
+    setup = {
+        "files": args.files, "pages_per_file": args.pages,
+        "corpus_mb": sum(len(b) for _, b in corpus) / 1024 / 1024,
+        "corpus_build_s": time.perf_counter() - t0,
+        "backend": "compact" if args.compact else "chroma",
+    }
+    embeddings = _embeddings(args)
+    recorder = StageRecorder()
+    chunk_counts = []
+
+    def one(i):
+        # 每個請求模擬一個 session 上傳 files_per_upload 份文件
+        picks = [corpus[(i * args.files_per_upload + j) % len(corpus)] for j in range(args.files_per_upload)]
+        with recorder.stage("load_and_split"):
+            splits = load_and_split(picks)
+        with recorder.stage("build_vector_store"):
+            store = build_vector_store(splits, embeddings, f"collection_{uuid.uuid4()}", compact=args.compact)
+        chunk_counts.append(len(splits))
+        store.delete_collection()
+
+    wall = run_load(one, args.requests, args.concurrency, recorder)
+    extra = {"chunks_per_upload": float(np.mean(chunk_counts)) if chunk_counts else 0.0}
+    return report("ingest", recorder, wall, args.requests, setup, extra)
+
+
+# ================= 情境：投資分析 Agent =================
+
+class _NullPlaceholder:
+    def markdown(self, text):
+        pass
+
+
+def _build_rag(args, llm):
+    from rag_pipeline import build_vector_store, build_cached_qa, load_and_split
+    from semantic_cache import SemanticAnswerCache, collection_fingerprint
+
+    corpus = synthetic_pdf_corpus(args.files, pages=args.pages, seed=args.seed)
+    embeddings = _embeddings(args)
+    store = build_vector_store(load_and_split(corpus), embeddings, f"collection_{uuid.uuid4()}", compact=args.compact)
+    fingerprint = collection_fingerprint(corpus, model_name=embeddings.model_name)
+    cache = SemanticAnswerCache() if args.answer_cache else SemanticAnswerCache(max_entries=0)
+    return store, lambda: build_cached_qa(llm, store, embeddings, cache, fingerprint)
+
+
+def bench_agent(args):
+    from langchain_groq import ChatGroq
+    from agent_runtime import StreamingStepHandler
+    from investment_tools import (
+        build_agent, build_tools, extract_symbols, plan_tools, run_concurrent_analysis, set_news_searcher,
+    )
+    from news_search import NewsSearcher
+
+    recorder = StageRecorder()
+    news_backend = SyntheticNewsBackend(latency=args.search_latency)
+    set_news_searcher(NewsSearcher(news_backend, ttl=600 if args.news_cache else 0, timeout=6.0))
+
+    with StubLLMServer(llm_config(args)) as server, patch_market_data(latency=args.market_latency):
+        llm = ChatGroq(groq_api_key="stub", groq_api_base=server.base_url, model_name="llama-3.1-8b-instant",
+                       temperature=0.1, max_retries=0)
+        store, make_rag = _build_rag(args, llm) if args.rag else (None, None)
+
+        def one(i):
+            question = AGENT_QUESTIONS[i % len(AGENT_QUESTIONS)]
+            handler = StreamingStepHandler(_NullPlaceholder(), stream_tokens=False)
+            rag_func = make_rag().run if make_rag else None
+            symbols = extract_symbols(question) if args.mode == "concurrent" else []
+            planned = plan_tools(question, has_rag=rag_func is not None) if symbols else []
+            if planned:
+                handler.stream_tokens = True
+                run_concurrent_analysis(question, symbols, llm, rag_func, handler, tools=planned)
+            else:
+                build_agent(llm, build_tools(rag_func)).run(question, callbacks=[handler])
+            for name, sec in handler.tool_latency:
+                recorder.add(f"tool:{name}", sec)
+
+        wall = run_load(one, args.requests, args.concurrency, recorder)
+        extra = {
+            "mode": args.mode, "llm_requests": server.requests,
+            "search_backend_calls": news_backend.calls,
+        }
+    if store is not None:
+        store.delete_collection()
+    return report("agent", recorder, wall, args.requests, extra=extra)
+
+
+# ================= 輸出 =================
+
+def print_report(result):
+    print(f"\n=== {result['scenario']} ===")
+    for key in ("setup",):
+        if key in result:
+            print("  " + ", ".join(f"{k}={_fmt(v)}" for k, v in result[key].items()))
+    print(f"  requests={result['requests']} errors={result['errors']} wall={result['wall_s']:.2f}s "
+          f"throughput={result['throughput_rps']:.2f} req/s")
+    extras = {k: v for k, v in result.items()
+              if k not in ("scenario", "requests", "errors", "wall_s", "throughput_rps", "stages", "setup")}
+    if extras:
+        print("  " + ", ".join(f"{k}={_fmt(v)}" for k, v in extras.items()))
+    print(f"  {'stage':<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, s in sorted(result["stages"].items(), key=lambda kv: kv[0] == "total"):
+        print(f"  {stage:<28}{s['n']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+
+def _fmt(v):
+    return f"{v:.3f}" if isinstance(v, float) else str(v)
+
+
+SCENARIOS = {"shopai": bench_shopai, "ingest": bench_ingest, "agent": bench_agent}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ShopAI / AI 投資分析師 端到端 benchmark (離線)")
+    parser.add_argument("scenario", choices=list(SCENARIOS) + ["all"])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true")
+
+    llm = parser.add_argument_group("假 LLM")
+    llm.add_argument("--llm-latency", type=float, default=0.2, help="首字延遲 (秒)")
+    llm.add_argument("--tps", type=float, default=250.0, help="每秒輸出 token 數")
+    llm.add_argument("--completion-tokens", type=int, default=120)
+    llm.add_argument("--sql-error-rate", type=float, default=0.0, help="觸發 SQL 自我修正的機率")
+
+    shop = parser.add_argument_group("shopai")
+    shop.add_argument("--catalog", type=int, default=10_000, help="合成商品數 (1 萬 ~ 500 萬)")
+
+    docs = parser.add_argument_group("ingest / agent RAG")
+    docs.add_argument("--files", type=int, default=8, help="合成財報份數")
+    docs.add_argument("--pages", type=int, default=10)
+    docs.add_argument("--files-per-upload", type=int, default=2)
+    docs.add_argument("--compact", action="store_true", help="改用 int8 精簡索引")
+    docs.add_argument("--real-embeddings", action="store_true", help="使用 FastEmbed (需已下載模型)")
+
+    agent = parser.add_argument_group("agent")
+    agent.add_argument("--mode", choices=["concurrent", "agent"], default="concurrent")
+    agent.add_argument("--market-latency", type=float, default=0.3, help="模擬 yfinance 每次呼叫延遲 (秒)")
+    agent.add_argument("--search-latency", type=float, default=0.5, help="模擬搜尋延遲 (秒)")
+    agent.add_argument("--news-cache", action="store_true", help="啟用新聞 TTL 快取")
+    agent.add_argument("--rag", action="store_true", help="加入 Financial_Report_RAG")
+    agent.add_argument("--answer-cache", action="store_true", help="啟用財報語意快取")
+    args = parser.parse_args()
+
+    names = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = [SCENARIOS[name](args) for name in names]
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for r in results:
+            print_report(r)
+
+
+if __name__ == "__main__":
+    main()
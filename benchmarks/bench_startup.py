@@ -0,0 +1,153 @@
+"""
+冷啟動 benchmark：各套件的 import 成本 + app.py 第一次畫面 (first render) 的耗時
+
+量測的是 lazy_deps 實際預熱的模組 (chromadb / pypdf / fastembed 等)，不是 langchain_community 的延遲載入空殼。
+
+每一項都在全新的子行程中量測，模擬 autoscaling 時 worker 冷啟動的情況。
+
+用法：
+    python benchmarks/bench_startup.py            # 預設量測所有重量級套件 + first render
+    python benchmarks/bench_startup.py --repeat 5 --json
+    python benchmarks/bench_startup.py --skip-render
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from lazy_deps import RAG_MODULES, AGENT_MODULES  # noqa: E402
+
+STARTUP_MODULES = ("streamlit", "lazy_deps", "news_search", "collection_registry", "investment_tools")
+
+RENDER_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+import lazy_deps
+heavy = []
+_prewarm = lazy_deps.prewarm_rag_stack
+def _snapshot_then_prewarm():
+    # 預熱開始前記下已載入的重量級套件，才量得到 first render 本身載入了什麼
+    heavy.extend(m for m in {heavy!r} if m in sys.modules)
+    return _prewarm()
+lazy_deps.prewarm_rag_stack = _snapshot_then_prewarm
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.secrets["GOOGLE_API_KEY"] = ""
+at.secrets["GROQ_API_KEY"] = ""
+t1 = time.perf_counter()
+at.run()
+t2 = time.perf_counter()
+if lazy_deps._prewarm_thread is not None:
+    lazy_deps._prewarm_thread.join()
+t3 = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import": t1 - t0,
+    "first_render": t2 - t1,
+    "prewarm": t3 - t2,
+    "heavy_loaded_at_render": heavy,
+    "prewarm_imports": lazy_deps.IMPORT_TIMES,
+    "errors": [e.value for e in at.exception],
+}}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _importtime_total(code):
+    """以 -X importtime 量測一段程式碼中所有 import 的 self time 總和 (秒)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=ROOT, env=_env(),
+    )
+    if proc.returncode != 0:
+        return None
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            total_us += int(line.split("|")[0].split(":")[1])
+        except ValueError:
+            continue
+    return total_us / 1e6
+
+
+def measure_imports(modules, repeat):
+    baseline = statistics.median(_importtime_total("pass") or 0 for _ in range(repeat))
+    rows = []
+    for name in modules:
+        samples = [_importtime_total(f"import {name}") for _ in range(repeat)]
+        if any(s is None for s in samples):
+            rows.append({"module": name, "seconds": None})
+            continue
+        rows.append({"module": name, "seconds": max(statistics.median(samples) - baseline, 0.0)})
+    return rows
+
+
+def measure_render(repeat):
+    script = RENDER_SCRIPT.format(app=str(ROOT / "app.py"), heavy=list(RAG_MODULES + AGENT_MODULES))
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT, env=_env(),
+        )
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    summary = {k: statistics.median(r[k] for r in runs) for k in ("streamlit_import", "first_render", "prewarm")}
+    summary["heavy_loaded_at_render"] = runs[-1]["heavy_loaded_at_render"]
+    summary["prewarm_imports"] = runs[-1]["prewarm_imports"]
+    summary["errors"] = runs[-1]["errors"]
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app.py 冷啟動 benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="每項量測次數 (取中位數)")
+    parser.add_argument("--skip-render", action="store_true", help="只量測 import，不跑 first render")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    modules = STARTUP_MODULES + RAG_MODULES + AGENT_MODULES
+    report = {"imports": measure_imports(modules, args.repeat)}
+    if not args.skip_render:
+        report["render"] = measure_render(args.repeat)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'module':<52}{'import (ms)':>12}   stage")
+    for row in sorted(report["imports"], key=lambda r: -(r["seconds"] or 0)):
+        stage = "startup" if row["module"] in STARTUP_MODULES else (
+            "prewarm" if row["module"] in RAG_MODULES else "first question")
+        ms = "missing" if row["seconds"] is None else f"{row['seconds'] * 1000:.1f}"
+        print(f"{row['module']:<52}{ms:>12}   {stage}")
+
+    render = report.get("render")
+    if render:
+        print()
+        if "error" in render:
+            print(f"first render: 失敗 ({render['error']})")
+            return
+        print(f"streamlit import     : {render['streamlit_import'] * 1000:8.1f} ms")
+        print(f"time to first render : {render['first_render'] * 1000:8.1f} ms")
+        print(f"background prewarm   : {render['prewarm'] * 1000:8.1f} ms (畫面送出後)")
+        if render["heavy_loaded_at_render"]:
+            print(f"⚠️ first render 已載入重量級套件: {', '.join(render['heavy_loaded_at_render'])}")
+        for err in render["errors"]:
+            print(f"⚠️ app 例外: {err}")
+
+
+if __name__ == "__main__":
+    main()
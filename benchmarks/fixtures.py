@@ -0,0 +1,235 @@
+"""
+Benchmark 用的離線資料來源
+
+- patch_market_data：以合成行情取代 yf.Ticker / yf.download (可設定延遲模擬網路)
+- SyntheticNewsBackend：給 news_search.NewsSearcher 用的假搜尋 backend
+- synthetic_catalog：ShopAI 用的合成商品目錄 (1 萬 ~ 500 萬 SKU，generator 不會一次佔滿記憶體)
+- synthetic_pdf_corpus：合成財報 PDF (純 Python 產生，不需額外套件)
+- HashEmbeddings：離線的特徵雜湊嵌入，取代需要下載模型的 FastEmbed
+"""
+import hashlib
+import random
+import re
+import sys
+import time
+import types
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from news_search import NewsItem
+
+# ================= 行情 (yfinance) =================
+
+def _symbol_rng(symbol):
+    return random.Random(int(hashlib.md5(symbol.encode("utf-8")).hexdigest()[:8], 16))
+
+
+def synthetic_history(symbol, days=63):
+    """以隨機漫步產生近三個月的日 K 資料 (同一代碼每次結果相同)"""
+    rng = _symbol_rng(symbol)
+    price = rng.uniform(20, 900)
+    rows = []
+    for _ in range(days):
+        open_ = price
+        price = max(1.0, price * (1 + rng.gauss(0, 0.02)))
+        high = max(open_, price) * (1 + abs(rng.gauss(0, 0.006)))
+        low = min(open_, price) * (1 - abs(rng.gauss(0, 0.006)))
+        rows.append((open_, high, low, price, rng.randint(10_000, 5_000_000)))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    return pd.DataFrame(rows, index=index, columns=["Open", "High", "Low", "Close", "Volume"])
+
+
+class FakeTicker:
+    """yf.Ticker 的替身：只實作 app 用到的 info 與 history()"""
+
+    latency = 0.0
+
+    def __init__(self, symbol):
+        self.ticker = symbol
+        self._rng = _symbol_rng(symbol)
+
+    @property
+    def info(self):
+        time.sleep(self.latency)
+        price = round(self._rng.uniform(20, 900), 2)
+        eps = round(self._rng.uniform(1, 40), 2)
+        return {
+            "currency": "TWD" if ".TW" in self.ticker else "USD",
+            "currentPrice": price,
+            "trailingPE": round(price / eps, 2),
+            "trailingEps": eps,
+            "shortName": self.ticker,
+        }
+
+    def history(self, period="3mo", interval="1d", **kwargs):
+        time.sleep(self.latency)
+        return synthetic_history(self.ticker)
+
+
+def fake_download(tickers, period="3mo", interval="1d", **kwargs):
+    time.sleep(FakeTicker.latency)
+    return synthetic_history(tickers if isinstance(tickers, str) else tickers[0])
+
+
+@contextmanager
+def patch_market_data(latency=0.0):
+    """
+    在區塊內把 yfinance 的 Ticker / download 換成合成資料。
+    沒安裝 yfinance 時，暫時放入一個只有這兩個屬性的模組。
+    """
+    FakeTicker.latency = latency
+    installed = "yfinance" in sys.modules
+    try:
+        import yfinance as yf
+    except ImportError:
+        yf = types.ModuleType("yfinance")
+        sys.modules["yfinance"] = yf
+        installed = None
+    saved = {name: getattr(yf, name, None) for name in ("Ticker", "download")}
+    yf.Ticker, yf.download = FakeTicker, fake_download
+    try:
+        yield yf
+    finally:
+        if installed is None:
+            sys.modules.pop("yfinance", None)
+        else:
+            for name, value in saved.items():
+                setattr(yf, name, value)
+
+
+# ================= 新聞搜尋 =================
+
+class SyntheticNewsBackend:
+    """任何查詢都回傳 num_results 則合成新聞；latency 模擬搜尋延遲"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def __call__(self, query, num_results):
+        self.calls += 1
+        if self.latency: time.sleep(self.latency)
+        return [
+            NewsItem(
+                title=f"{query} 最新動態 #{i + 1}",
+                description=f"市場關注 {query}，法人預期下季營收持續成長。",
+                url=f"https://news.example/{hashlib.md5(f'{query}{i}'.encode()).hexdigest()[:10]}",
+            )
+            for i in range(num_results)
+        ]
+
+
+# ================= ShopAI 合成商品目錄 =================
+
+CATEGORIES = {
+    "BEV": "飲料", "FRE": "鮮食", "SNK": "零食", "DAL": "日用品", "ALC": "酒類", "TOB": "香菸",
+}
+SUPPLIERS = ["太古可樂", "統一企業", "味全食品", "維他露", "百事食品", "義美食品", "金百利", "台灣菸酒", "聯華食品", "大成食品"]
+
+
+def synthetic_catalog(n, seed=0):
+    """產生 n 筆與 products 表欄位相同的商品 (generator)"""
+    rng = random.Random(seed)
+    prefixes = list(CATEGORIES)
+    start = date(2023, 9, 1)
+    for i in range(n):
+        prefix = prefixes[i % len(prefixes)]
+        cost = rng.randint(5, 800)
+        price = int(cost * rng.uniform(1.1, 1.8))
+        stock = max(0, int(rng.expovariate(1 / 80)) if rng.random() > 0.05 else 0)
+        sales = int(rng.expovariate(1 / 40))
+        status = "缺貨" if stock == 0 else ("補貨中" if stock < 10 else "正常")
+        yield (
+            f"{prefix}-{i:07d}", f"{CATEGORIES[prefix]}商品 {i}", CATEGORIES[prefix],
+            price, cost, stock, sales, rng.choice(SUPPLIERS), status,
+            (start + timedelta(days=rng.randint(0, 120))).isoformat(),
+        )
+
+
+# ================= 合成財報 PDF =================
+
+_COMPANIES = ["Formosa Semicon", "Pacific Retail", "Jade Logistics", "Harbor Bank", "Lotus Biotech", "Summit Steel"]
+_METRICS = ["revenue", "gross margin", "operating income", "net income", "free cash flow", "capital expenditure"]
+
+
+def _report_sentence(rng, company, quarter):
+    metric = rng.choice(_METRICS)
+    return (f"In {quarter}, {company} reported {metric} of {rng.randint(100, 9000):,} million, "
+            f"{rng.choice(['up', 'down'])} {rng.uniform(0.5, 30):.1f}% year over year.")
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(pages):
+    """把 [[行, ...], ...] 寫成最小可被 pypdf 解析的 PDF (Helvetica，僅 ASCII)"""
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        stream = "BT /F1 9 Tf 40 800 Td 11 TL\n" + "".join(f"({_pdf_escape(l)}) '\n" for l in lines) + "ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode("latin-1"))
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        )
+        kids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] /Count {len(kids)} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n".encode("latin-1") + obj + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for off in offsets:
+        out += f"{off:010d} 00000 n \n".encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    return bytes(out)
+
+
+def synthetic_pdf_corpus(n_files, pages=10, lines_per_page=60, seed=0):
+    """產生 n_files 份合成季報，回傳 [(檔名, bytes), ...]，格式同 app 的上傳檔案"""
+    rng = random.Random(seed)
+    corpus = []
+    for f in range(n_files):
+        company = _COMPANIES[f % len(_COMPANIES)]
+        quarter = f"Q{f % 4 + 1} {2021 + f // 4 % 4}"
+        doc = [[_report_sentence(rng, company, quarter) for _ in range(lines_per_page)] for _ in range(pages)]
+        corpus.append((f"{company.replace(' ', '_')}_{quarter.replace(' ', '_')}_{f}.pdf", make_pdf(doc)))
+    return corpus
+
+
+# ================= 離線嵌入 =================
+
+class HashEmbeddings:
+    """
+    特徵雜湊 (feature hashing) 嵌入：字詞 -> 固定維度，相同字詞的段落彼此相近。
+    介面與 FastEmbedEmbeddings 相同 (embed_documents / embed_query / model_name)。
+    """
+
+    _TOKEN = re.compile(r"\w+")
+
+    def __init__(self, dim=384):
+        self.dim = dim
+        self.model_name = f"hash-{dim}"
+
+    def _embed(self, text):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for tok in self._TOKEN.findall(text.lower()):
+            h = int(hashlib.md5(tok.encode("utf-8")).hexdigest()[:8], 16)
+            v[h % self.dim] += 1.0 if h & 1 else -1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
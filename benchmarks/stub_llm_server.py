@@ -0,0 +1,233 @@
+"""
+本地 OpenAI / Groq 相容的 LLM 假伺服器 (不需網路、不花 token)
+
+- 任何以 /chat/completions 結尾的 POST 都會回應，所以 Groq SDK (base_url/openai/v1/...)
+  與 OpenAI SDK (base_url/chat/completions) 都能直接指過來
+- 可設定首字延遲 (latency) 與輸出速度 (tokens_per_sec)，支援 stream=True 的 SSE 串流
+- 依 prompt 內容產生「看起來合理」的回覆：
+  * ShopAI Text-to-SQL (system prompt 含 "SQLite expert") -> 依關鍵字回傳 SQL，可設定錯誤率測試自我修正
+  * LangChain structured-chat agent -> 依序呼叫 agent_steps 中的工具，最後給 Final Answer
+  * 其餘 (數據解讀 / 綜合分析 / RAG) -> 指定長度的中文分析文字
+
+單獨啟動：
+    python benchmarks/stub_llm_server.py --port 8765 --latency 0.3 --tps 250
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SQL_BY_KEYWORD = [
+    ("缺貨", "SELECT name, stock, supplier FROM products WHERE status = '缺貨' OR stock = 0 LIMIT 50"),
+    ("毛利", "SELECT name, price, cost, price - cost AS margin FROM products ORDER BY margin DESC LIMIT 5"),
+    ("供應商", "SELECT supplier, COUNT(*) AS items FROM products GROUP BY supplier ORDER BY items DESC LIMIT 20"),
+    ("類別", "SELECT category, SUM(cost * stock) AS inventory_value FROM products GROUP BY category"),
+    ("低於", "SELECT name, stock, sales_7d FROM products WHERE stock < 10 LIMIT 50"),
+    ("危險", "SELECT name, stock, sales_7d FROM products WHERE stock < sales_7d LIMIT 50"),
+]
+DEFAULT_SQL = "SELECT name, category, stock, sales_7d FROM products ORDER BY sales_7d DESC LIMIT 5"
+BROKEN_SQL = "SELECT name FROM product_table_typo LIMIT 5"
+
+TICKER = re.compile(r"\d{4,6}\.TWO?|\b[A-Z]{2,5}\b")
+FILLER = "根據目前取得的數據，營收與毛利維持穩定成長，庫存水位健康，建議持續觀察市場動態並適度調整部位。"
+
+
+@dataclass
+class StubLLMConfig:
+    latency: float = 0.2          # 首字延遲 (秒)
+    tokens_per_sec: float = 200.0  # 輸出速度
+    completion_tokens: int = 120   # 一般回覆的長度 (token)
+    chars_per_token: int = 2
+    sql_error_rate: float = 0.0    # 第一次產生 SQL 時故意給錯的機率
+    agent_steps: list = field(default_factory=lambda: ["Stock_Price", "Draw_Kline_Chart", "Google_Search"])
+    seed: int = 0
+
+
+def _content(message):
+    content = message.get("content") or ""
+    if isinstance(content, list):  # 多段內容 (OpenAI 格式)
+        content = "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+class StubResponder:
+    def __init__(self, config):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, messages):
+        system = "\n".join(_content(m) for m in messages if m.get("role") == "system")
+        last_user = next((_content(m) for m in reversed(messages) if m.get("role") in ("user", "human")), "")
+
+        if "SQLite expert" in system:
+            return self._sql(system, last_user)
+        if "action_input" in system:
+            return self._agent(last_user)
+        n_chars = self.config.completion_tokens * self.config.chars_per_token
+        return (FILLER * (n_chars // len(FILLER) + 1))[:n_chars]
+
+    def _sql(self, system, query):
+        if "PREVIOUS SQL FAILED" not in system:
+            with self._lock:
+                broken = self._rng.random() < self.config.sql_error_rate
+            if broken:
+                return BROKEN_SQL
+        for keyword, sql in SQL_BY_KEYWORD:
+            if keyword in query:
+                return sql
+        return DEFAULT_SQL
+
+    def _agent(self, scratch):
+        step = scratch.count("Observation:")
+        if step < len(self.config.agent_steps):
+            match = TICKER.search(scratch)
+            blob = {"action": self.config.agent_steps[step], "action_input": match.group(0) if match else "2330.TW"}
+        else:
+            blob = {"action": "Final Answer", "action_input": FILLER}
+        return f"Action:\n```\n{json.dumps(blob, ensure_ascii=False)}\n```"
+
+
+def _tokens(text, chars_per_token):
+    return [text[i:i + chars_per_token] for i in range(0, len(text), chars_per_token)] or [""]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self._send_json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+
+    def do_POST(self):
+        server = self.server
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        reply = server.responder(body.get("messages", []))
+        tokens = _tokens(reply, server.config.chars_per_token)
+        model = body.get("model", "stub-model")
+        server.count_request(len(tokens))
+
+        time.sleep(server.config.latency)
+        if body.get("stream"):
+            self._stream(model, tokens)
+        else:
+            time.sleep(len(tokens) / server.config.tokens_per_sec)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+            })
+
+    def _stream(self, model, tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        delay = 1.0 / self.server.config.tokens_per_sec
+        for i, token in enumerate(tokens):
+            delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            self._sse(chunk_id, model, delta, None)
+            time.sleep(delay)
+        self._sse(chunk_id, model, {}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+    def _sse(self, chunk_id, model, delta, finish_reason):
+        payload = {
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """在背景執行緒啟動的假 LLM 伺服器；可當 context manager 使用"""
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, responder=None):
+        super().__init__((host, port), _Handler)
+        self.config = config or StubLLMConfig()
+        self.responder = responder or StubResponder(self.config)
+        self.requests = 0
+        self.completion_tokens = 0
+        self._count_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count_request(self, tokens):
+        with self._count_lock:
+            self.requests += 1
+            self.completion_tokens += tokens
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI / Groq 相容 LLM 假伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="首字延遲 (秒)")
+    parser.add_argument("--tps", type=float, default=200.0, help="每秒輸出 token 數")
+    parser.add_argument("--completion-tokens", type=int, default=120)
+    parser.add_argument("--sql-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubLLMConfig(
+        latency=args.latency, tokens_per_sec=args.tps,
+        completion_tokens=args.completion_tokens, sql_error_rate=args.sql_error_rate,
+    )
+    server = StubLLMServer(config, host=args.host, port=args.port)
+    print(f"stub LLM listening on {server.base_url} (Groq: base_url={server.base_url}, OpenAI: {server.base_url}/v1)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
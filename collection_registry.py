@@ -0,0 +1,190 @@
+"""
+Chroma collection 生命週期管理
+
+每次上傳都會在同一個 in-process Chroma client 建立新的 collection_{uuid}，
+只丟掉 Python 參照並不會刪掉 collection，長時間執行的 worker 記憶體會越吃越多。
+CollectionRegistry 負責：
+- 把 collection 綁定到 session，session 重置 / 換檔 / 逾時時真正刪除
+- 全域上限 (collection 數量、估計位元組)，超過時以 LRU 淘汰最久沒用的
+- 回報目前常駐的向量數與估計記憶體用量
+- 記住 collection 被刪除的原因 (淘汰 / 逾時 / 釋放)，讓 UI 顯示正確的提示
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+# 刪除原因
+RELEASED = "released"  # session 重置 / 換檔
+EXPIRED = "expired"    # session 閒置超過 session_ttl
+EVICTED = "evicted"    # 超過全域上限被 LRU 淘汰
+
+
+class CollectionTooLargeError(ValueError):
+    """單一 collection 就超過全域記憶體上限"""
+
+    def __init__(self, size, limit):
+        self.size = size
+        self.limit = limit
+        super().__init__(f"文件太大：約 {size / 1024 / 1024:.1f} MB，超過單一伺服器上限 {limit / 1024 / 1024:.0f} MB")
+
+
+@dataclass
+class CollectionEntry:
+    name: str
+    session_id: str
+    store: object
+    vectors: int
+    dim: int
+    text_bytes: int = 0
+    fingerprint: str = None
+    bytes_per_value: int = 4  # float32 = 4；int8 精簡索引 = 1
+    created_at: float = field(default_factory=time.time)
+    last_access: float = field(default_factory=time.time)
+
+    @property
+    def vector_bytes(self):
+        return self.vectors * self.dim * self.bytes_per_value
+
+    @property
+    def bytes(self):
+        return self.vector_bytes + self.text_bytes
+
+
+class CollectionRegistry:
+    """
+    執行緒安全、跨 session 共用 (放在 st.cache_resource)。
+    on_delete(entry) 會在 collection 被刪除後呼叫，例如讓語意快取作廢。
+    """
+
+    def __init__(self, max_collections=32, max_bytes=512 * 1024 * 1024, session_ttl=3600, on_delete=None):
+        self.max_collections = max_collections
+        self.max_bytes = max_bytes
+        self.session_ttl = session_ttl
+        self.on_delete = on_delete
+        self._entries = {}        # name -> CollectionEntry
+        self._sessions = {}       # session_id -> 最後活動時間
+        self._removed = OrderedDict()  # name -> 刪除原因 (只留最近的，給 removal_reason 查詢)
+        self._lock = threading.RLock()
+        self.evictions = 0
+
+    @staticmethod
+    def estimate_bytes(vectors, dim, text_bytes=0, bytes_per_value=4):
+        """與 CollectionEntry.bytes 相同的估算；建立向量庫前先和 max_bytes 比較，避免白做嵌入"""
+        return vectors * dim * bytes_per_value + text_bytes
+
+    def register(self, session_id, name, store, vectors, dim, text_bytes=0, fingerprint=None, bytes_per_value=4):
+        """
+        登記新 collection；同一 session 的舊 collection 會被刪除，再依全域上限淘汰。
+        單獨就超過 max_bytes 的 collection 直接刪除並丟出 CollectionTooLargeError，
+        不會為了它把其他 session 全部淘汰。
+        """
+        entry = CollectionEntry(name, session_id, store, vectors, dim, text_bytes, fingerprint, bytes_per_value)
+        if entry.bytes > self.max_bytes:
+            self._drop_store(entry)
+            raise CollectionTooLargeError(entry.bytes, self.max_bytes)
+        with self._lock:
+            self._entries[name] = entry
+            # 先登記新的再刪舊的：重新上傳同一批文件時，on_delete 看得到指紋仍在使用中
+            victims = self._pop_session(session_id, keep=name, reason=RELEASED)
+            self._sessions[session_id] = time.time()
+            victims += self._enforce_budget(keep=name)
+        self._finalize(victims)
+        return entry
+
+    def is_alive(self, name):
+        with self._lock:
+            return name in self._entries
+
+    def removal_reason(self, name):
+        """collection 被刪除的原因 (RELEASED / EXPIRED / EVICTED)；不知道時回傳 None"""
+        with self._lock:
+            return self._removed.get(name)
+
+    def fingerprint_in_use(self, fingerprint):
+        """是否還有其他 collection 使用同一份文件集"""
+        with self._lock:
+            return any(e.fingerprint == fingerprint for e in self._entries.values())
+
+    def touch(self, session_id, name=None):
+        """標記 session (與其 collection) 仍在使用中"""
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = now
+            if name in self._entries:
+                self._entries[name].last_access = now
+
+    def release_session(self, session_id, keep=None, reason=RELEASED):
+        """刪除某個 session 的所有 collection (keep 除外)，回傳刪除數量"""
+        with self._lock:
+            victims = self._pop_session(session_id, keep, reason)
+        self._finalize(victims)
+        return len(victims)
+
+    def expire(self, now=None):
+        """刪除閒置超過 session_ttl 的 session 所持有的 collection"""
+        now = now or time.time()
+        with self._lock:
+            stale = [sid for sid, t in self._sessions.items() if now - t > self.session_ttl]
+            victims = []
+            for sid in stale:
+                victims += self._pop_session(sid, reason=EXPIRED)
+                del self._sessions[sid]
+        self._finalize(victims)
+        return len(victims)
+
+    def stats(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            return {
+                "collections": len(entries),
+                "sessions": len({e.session_id for e in entries}),
+                "vectors": sum(e.vectors for e in entries),
+                "vector_bytes": sum(e.vector_bytes for e in entries),
+                "bytes": sum(e.bytes for e in entries),
+                "evictions": self.evictions,
+            }
+
+    # 以下 _pop_* / _enforce_budget 必須在持有 _lock 時呼叫，只從登記表移除並回傳被移除的 entry；
+    # 真正刪除 store (CompactVectorIndex 會等進行中的查詢) 與 on_delete 由 _finalize 在釋放鎖之後執行，
+    # 避免一個慢的刪除卡住所有 session 的 expire() / touch()。
+
+    def _pop_session(self, session_id, keep=None, reason=RELEASED):
+        names = [n for n, e in self._entries.items() if e.session_id == session_id and n != keep]
+        return [self._pop(n, reason) for n in names]
+
+    def _enforce_budget(self, keep=None):
+        def over():
+            total = sum(e.bytes for e in self._entries.values())
+            return len(self._entries) > self.max_collections or total > self.max_bytes
+
+        victims = []
+        while over():
+            candidates = [e for e in self._entries.values() if e.name != keep]
+            if not candidates:
+                break
+            victim = min(candidates, key=lambda e: e.last_access)
+            victims.append(self._pop(victim.name, EVICTED))
+            self.evictions += 1
+        return victims
+
+    def _pop(self, name, reason):
+        entry = self._entries.pop(name)
+        self._removed[name] = reason
+        while len(self._removed) > 4 * self.max_collections:
+            self._removed.popitem(last=False)
+        return entry
+
+    def _finalize(self, victims):
+        for entry in victims:
+            self._drop_store(entry)
+            if self.on_delete:
+                self.on_delete(entry)
+
+    @staticmethod
+    def _drop_store(entry):
+        try:
+            drop = getattr(entry.store, "delete_collection", None)
+            if drop: drop()
+        except Exception:
+            pass  # collection 可能已不存在，登記表仍要移除
@@ -0,0 +1,293 @@
+"""
+精簡向量索引 (int8 量化 + memory-mapped NumPy)
+
+Chroma 對每個 800 字的 chunk 都常駐完整的 float32 向量，一年份、幾十家公司的季報一上傳，
+記憶體與查詢延遲都會快速上升。這裡提供一個可選的替代 backend：
+- 向量先正規化，再以「每個向量一個 scale」量化成 int8，存成 .npy 並以 memmap 開啟 (約 1/4 記憶體)
+- chunk 文字與 metadata 存在旁邊的 chunks.jsonl，只記位移量，用到時才讀
+- 以區塊 (block) 批次計算 top-k，可一次查多個問題
+- 可選的 float32 精確重排序：原始向量存在磁碟上的 memmap，只讀 shortlist 那幾列
+- as_retriever() 介面與 Chroma 相同，可直接交給 RetrievalQA
+- 索引都放在 INDEX_ROOT/pid-<pid>/ 下；process 第一次使用時清掉已結束的 worker 留下的目錄
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+INT8_FILE = "vectors.i8.npy"
+SCALE_FILE = "scales.f32.npy"
+FLOAT_FILE = "vectors.f32.npy"
+CHUNK_FILE = "chunks.jsonl"
+
+INDEX_ROOT = os.environ.get("COMPACT_INDEX_ROOT") or os.path.join(tempfile.gettempdir(), "rag_compact_index")
+
+_root_lock = threading.Lock()
+_root_ready = False
+
+
+class IndexClosedError(RuntimeError):
+    """索引已被 delete_collection 回收 (例如被 CollectionRegistry 淘汰)"""
+
+
+def _pid_alive(pid):
+    if os.name != "posix":
+        return True  # 非 POSIX 沒有安全的存活檢查，寧可不刪
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_stale_indexes(root=INDEX_ROOT):
+    """刪除 root 下已結束的 process 留下的 pid-* 目錄，回傳刪除數量"""
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    for name in os.listdir(root):
+        pid = name[4:] if name.startswith("pid-") else ""
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+            removed += 1
+    return removed
+
+
+def index_root():
+    """本 process 的索引目錄；第一次呼叫時順便清掉舊 worker (與同 pid 的舊 process) 留下的索引"""
+    global _root_ready
+    own = os.path.join(INDEX_ROOT, f"pid-{os.getpid()}")
+    with _root_lock:
+        if not _root_ready:
+            cleanup_stale_indexes()
+            shutil.rmtree(own, ignore_errors=True)
+            _root_ready = True
+        os.makedirs(own, exist_ok=True)
+    return own
+
+
+def quantize(vectors):
+    """正規化後做對稱 int8 量化，回傳 (int8 向量, 每列 scale)"""
+    v = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(v, axis=1, keepdims=True)
+    v = v / np.where(norms > 0, norms, 1.0)
+    scales = np.abs(v).max(axis=1) / 127.0
+    scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+    q = np.clip(np.rint(v / scales[:, None]), -127, 127).astype(np.int8)
+    return q, scales, v
+
+
+def _normalize_rows(x):
+    x = np.atleast_2d(np.asarray(x, dtype=np.float32))
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(norms > 0, norms, 1.0)
+
+
+class CompactVectorIndex:
+    """
+    磁碟上的 int8 向量索引；以 from_documents / from_vectors 建立。
+    可被多個執行緒同時查詢；delete_collection 會等進行中的查詢結束才釋放，之後的查詢丟出 IndexClosedError。
+    """
+
+    def __init__(self, directory, embedding=None, block_size=16384):
+        self.directory = directory
+        self.embedding = embedding
+        self.block_size = block_size
+        self._cond = threading.Condition()
+        self._active = 0
+        self._closed = False
+        self._q = np.load(os.path.join(directory, INT8_FILE), mmap_mode="r")
+        self._scales = np.load(os.path.join(directory, SCALE_FILE))
+        float_path = os.path.join(directory, FLOAT_FILE)
+        self._f = np.load(float_path, mmap_mode="r") if os.path.exists(float_path) else None
+        self._offsets = self._scan_offsets(os.path.join(directory, CHUNK_FILE))
+
+    # ---------- 建立 ----------
+
+    @classmethod
+    def from_documents(cls, documents, embedding, directory=None, batch_size=256, keep_float=True, **kwargs):
+        """仿 Chroma.from_documents：分批向量化後直接寫入 memmap，不會整批留在記憶體"""
+        texts = [d.page_content for d in documents]
+        batches = (
+            embedding.embed_documents(texts[i:i + batch_size])
+            for i in range(0, len(texts), batch_size)
+        )
+        directory = _write_index(directory, len(texts), batches, documents, keep_float)
+        return cls(directory, embedding=embedding)
+
+    @classmethod
+    def from_vectors(cls, vectors, documents, directory=None, embedding=None, batch_size=4096, keep_float=True):
+        """已經有向量時 (例如 benchmark) 直接建立索引"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        batches = (vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size))
+        directory = _write_index(directory, len(vectors), batches, documents, keep_float)
+        return cls(directory, embedding=embedding)
+
+    # ---------- 查詢 ----------
+
+    @contextmanager
+    def _reading(self):
+        with self._cond:
+            if self._closed:
+                raise IndexClosedError(f"向量索引已被回收 ({self.directory})，請重新上傳文件")
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not self._active:
+                    self._cond.notify_all()
+
+    def __len__(self):
+        return self._q.shape[0]
+
+    @property
+    def dim(self):
+        return self._q.shape[1]
+
+    def search_batch(self, query_vectors, k=5, rescore=True, shortlist=None):
+        """
+        一次查多個問題，回傳每個問題的 [(chunk 索引, 分數), ...] (分數高到低)。
+        rescore=True 且有保留 float 向量時，先以 int8 取 shortlist (預設 4k)，再用 float32 精確重排。
+        """
+        with self._reading():
+            return self._search_batch(query_vectors, k, rescore, shortlist)
+
+    def _search_batch(self, query_vectors, k, rescore, shortlist):
+        Q = _normalize_rows(query_vectors)
+        n, m = len(self), Q.shape[0]
+        if n == 0:
+            return [[] for _ in range(m)]
+        rescore = rescore and self._f is not None
+        width = min(n, max(k, shortlist or 4 * k) if rescore else k)
+
+        best_scores = np.full((m, 0), -np.inf, dtype=np.float32)
+        best_idx = np.zeros((m, 0), dtype=np.int64)
+        for start in range(0, n, self.block_size):
+            end = min(start + self.block_size, n)
+            block = np.asarray(self._q[start:end], dtype=np.float32)
+            scores = (Q @ block.T) * self._scales[start:end]  # (m, b)
+            idx = np.broadcast_to(np.arange(start, end), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            idx = np.concatenate([best_idx, idx], axis=1)
+            if scores.shape[1] > width:
+                top = np.argpartition(-scores, width - 1, axis=1)[:, :width]
+                scores = np.take_along_axis(scores, top, axis=1)
+                idx = np.take_along_axis(idx, top, axis=1)
+            best_scores, best_idx = scores, idx
+
+        results = []
+        for qi in range(m):
+            cand, cand_scores = best_idx[qi], best_scores[qi]
+            if rescore:
+                order = np.argsort(cand)  # memmap 依序讀取比較快
+                cand = cand[order]
+                cand_scores = np.asarray(self._f[cand], dtype=np.float32) @ Q[qi]
+            top = np.argsort(-cand_scores)[:k]
+            results.append([(int(cand[i]), float(cand_scores[i])) for i in top])
+        return results
+
+    def document(self, i):
+        with self._reading():
+            return self._document(i)
+
+    def _document(self, i):
+        with open(os.path.join(self.directory, CHUNK_FILE), "rb") as f:
+            f.seek(int(self._offsets[i]))
+            row = json.loads(f.readline())
+        return Document(page_content=row["content"], metadata=row["metadata"])
+
+    def similarity_search(self, query, k=4, rescore=True):
+        vector = self.embedding.embed_query(query)
+        with self._reading():
+            hits = self._search_batch([vector], k, rescore, None)[0]
+            return [self._document(i) for i, _ in hits]
+
+    def as_retriever(self, search_kwargs=None, rescore=True):
+        """與 Chroma.as_retriever 相同的用法：as_retriever(search_kwargs={"k": 5})"""
+        k = (search_kwargs or {}).get("k", 4)
+        return CompactRetriever(index=self, k=k, rescore=rescore)
+
+    # ---------- 管理 ----------
+
+    def stats(self):
+        """常駐記憶體 (int8 向量 + scale + 位移表) 與磁碟上的 float 向量大小"""
+        with self._reading():
+            return {
+                "vectors": len(self),
+                "dim": self.dim,
+                "resident_bytes": self._q.nbytes + self._scales.nbytes + self._offsets.nbytes,
+                "float_bytes_on_disk": self._f.nbytes if self._f is not None else 0,
+            }
+
+    def delete_collection(self):
+        """與 Chroma 同名，讓 CollectionRegistry 可以直接回收 (會等其他 session 進行中的查詢結束)"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.wait_for(lambda: self._active == 0)
+            self._q = self._f = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    @staticmethod
+    def _scan_offsets(path):
+        offsets, pos = [], 0
+        with open(path, "rb") as f:
+            for line in f:
+                offsets.append(pos)
+                pos += len(line)
+        return np.asarray(offsets, dtype=np.int64)
+
+
+class CompactRetriever(BaseRetriever):
+    index: Any
+    k: int = 4
+    rescore: bool = True
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.index.similarity_search(query, k=self.k, rescore=self.rescore)
+
+
+def _write_index(directory, n, vector_batches, documents, keep_float):
+    directory = directory or tempfile.mkdtemp(prefix="compact_index_", dir=index_root())
+    os.makedirs(directory, exist_ok=True)
+    q_mm = f_mm = None
+    scales = None
+    pos = 0
+    for batch in vector_batches:
+        q, s, v = quantize(batch)
+        if q_mm is None:
+            dim = q.shape[1]
+            q_mm = np.lib.format.open_memmap(os.path.join(directory, INT8_FILE), mode="w+", dtype=np.int8, shape=(n, dim))
+            if keep_float:
+                f_mm = np.lib.format.open_memmap(os.path.join(directory, FLOAT_FILE), mode="w+", dtype=np.float32, shape=(n, dim))
+            scales = np.empty(n, dtype=np.float32)
+        q_mm[pos:pos + len(q)] = q
+        if f_mm is not None:
+            f_mm[pos:pos + len(q)] = v
+        scales[pos:pos + len(q)] = s
+        pos += len(q)
+
+    if q_mm is None:
+        raise ValueError("沒有可建立索引的向量")
+    q_mm.flush()
+    if f_mm is not None:
+        f_mm.flush()
+    del q_mm, f_mm
+    np.save(os.path.join(directory, SCALE_FILE), scales)
+
+    with open(os.path.join(directory, CHUNK_FILE), "w", encoding="utf-8") as f:
+        for d in documents:
+            f.write(json.dumps({"content": d.page_content, "metadata": dict(d.metadata)}, ensure_ascii=False, default=str) + "\n")
+    return directory
@@ -0,0 +1,320 @@
+"""
+AI 投資分析師的工具箱與 Agent (app.py 的第 5、6 段)
+
+從 app.py 抽出，不依賴 streamlit：K 線圖透過 render_chart(fig) 回呼交給呼叫端畫到畫面上，
+benchmark (benchmarks/bench_e2e.py) 可以在沒有 UI 的情況下驅動同一套工具、並行分析與 Agent。
+重量級套件 (yfinance / plotly / langchain) 一樣用到時才 import。
+"""
+import re
+import threading
+
+from news_search import COMPANY_ALIASES, NewsSearcher, query_variants
+
+TOOL_TIMEOUTS = {
+    "Stock_Price": 10,
+    "Draw_Kline_Chart": 15,
+    "Google_Search": 10,
+    "Financial_Report_RAG": 60,
+}
+
+# 台股代碼 (2330.TW / 6488.TWO)、明確標記的美股代碼 ($PLTR)、或名單內的美股代碼 (NVDA)。
+# 一般英文大寫字 (I / BUY / SELL / P/E) 不算，避免每個誤判都多打一輪股價 / K 線 / 新聞。
+SYMBOL_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9.$])(\d{4,6}\.TWO?)(?![A-Za-z0-9])"
+    r"|\$([A-Za-z]{1,5}(?:\.[A-Za-z]{1,2})?)(?![A-Za-z0-9])"
+    r"|(?<![A-Za-z0-9.$/])([A-Z]{2,5}(?:\.[A-Z])?)(?![A-Za-z0-9/])"
+)
+KNOWN_US_TICKERS = {symbol for symbol in COMPANY_ALIASES if not symbol[0].isdigit()} | {
+    "SPY", "QQQ", "DIA", "SOXX", "SMH", "BRK.B", "JPM", "BAC", "ORCL", "CRM", "ADBE", "COST",
+    "WMT", "DIS", "PLTR", "SMCI", "MU", "ARM", "UBER", "PYPL", "SHOP", "BABA", "NKE", "KO", "PEP",
+}
+
+# 並行模式只呼叫問題有提到的工具；問「分析 / 建議」才全部呼叫並給投資建議
+TOOL_KEYWORDS = {
+    "Stock_Price": ("股價", "價格", "現價", "報價", "多少錢", "本益比", "EPS", "PE", "P/E", "基本面", "表現", "price", "quote"),
+    # 不用單字「畫」「圖」：地圖 / 意圖 / 計畫 之類的字會被誤判成要畫 K 線
+    "Draw_Kline_Chart": ("走勢", "K線", "K 線", "k線", "畫圖", "畫出", "畫一張", "技術面", "chart", "trend"),
+    "Google_Search": ("新聞", "消息", "利多", "利空", "動態", "news"),
+    "Financial_Report_RAG": ("財報", "營收", "毛利", "獲利", "季報", "年報", "文件", "基本面", "revenue", "earnings"),
+}
+FULL_ANALYSIS_KEYWORDS = (
+    "分析", "建議", "評估", "值得", "該買", "該賣", "買進", "賣出", "投資",
+    "analyze", "analyse", "analysis", "buy", "sell", "hold", "invest",
+)
+
+# 🌟 Agent 指令設定 (System Prompt)
+AGENT_PREFIX = """
+你是一個專業的華爾街投資顧問。你的任務是綜合利用多種工具來回答使用者的投資問題。
+
+【你的工具箱】：
+1. Stock_Price: 查即時股價、PE、EPS。
+2. Draw_Kline_Chart: 當使用者提到「走勢圖」、「K線」、「畫圖」時，務必使用此工具。
+3. Google_Search: 查最近的新聞利多/利空。
+4. Financial_Report_RAG: (若有上傳文件) 查財報細節。
+
+【回答策略】：
+- 必須先調用工具獲取真實數據，不要憑空猜測。
+- 若使用者要求畫圖，請優先調用 Draw_Kline_Chart。
+- 最後請根據 股價表現 + 技術面(K線) + 基本面(財報) + 消息面(新聞) 給出綜合投資建議 (Buy/Hold/Sell)。
+"""
+
+SYNTHESIS_PROMPT = """
+你是一個專業的華爾街投資顧問。以下是系統剛剛「同時」從各工具取得的真實數據，請只根據這些數據回答，不要憑空猜測。
+若某個工具逾時或失敗，請直接說明該部分資料缺漏。
+
+{instruction}
+
+使用者問題：{question}
+
+【工具數據】
+{observations}
+"""
+FULL_ANALYSIS_INSTRUCTION = "最後請根據 股價表現 + 技術面(K線) + 基本面(財報) + 消息面(新聞) 給出綜合投資建議 (Buy/Hold/Sell)。"
+DIRECT_ANSWER_INSTRUCTION = "請直接回答使用者問的內容，不需要額外給投資建議。"
+
+_news_lock = threading.Lock()
+_news_searcher = None
+
+
+def get_news_searcher():
+    """全 process 共用：10 分鐘 TTL 快取，單次搜尋最多等 6 秒"""
+    global _news_searcher
+    with _news_lock:
+        if _news_searcher is None:
+            _news_searcher = NewsSearcher(ttl=600, timeout=6.0)
+        return _news_searcher
+
+
+def set_news_searcher(searcher):
+    """換掉新聞搜尋層 (例如 benchmark 改用本地 backend)"""
+    global _news_searcher
+    with _news_lock:
+        _news_searcher = searcher
+
+
+def extract_symbols(text: str, limit=3):
+    """從問題中抓出股票代碼 (如 2330.TW、NVDA、$PLTR)，保留出現順序"""
+    found = []
+    for m in SYMBOL_PATTERN.finditer(text):
+        tw, marked, bare = m.groups()
+        if bare and bare not in KNOWN_US_TICKERS:
+            continue
+        symbol = tw or (marked or bare).upper()
+        if symbol not in found:
+            found.append(symbol)
+    return found[:limit]
+
+
+def _mentions(text, keywords):
+    """英文關鍵字要整個字相符 (不分大小寫)，中文直接比對子字串"""
+    for k in keywords:
+        if k.isascii():
+            if re.search(rf"(?<![A-Za-z]){re.escape(k)}(?![A-Za-z])", text, re.IGNORECASE):
+                return True
+        elif k in text:
+            return True
+    return False
+
+
+def plan_tools(question: str, has_rag=False):
+    """
+    依問題決定並行模式要呼叫哪些工具。
+    問「分析 / 建議」時全部呼叫；否則只呼叫有提到的；都沒提到回傳 []，交給 Agent 自己判斷。
+    """
+    available = [name for name in TOOL_KEYWORDS if has_rag or name != "Financial_Report_RAG"]
+    if _mentions(question, FULL_ANALYSIS_KEYWORDS):
+        return available
+    return [name for name in available if _mentions(question, TOOL_KEYWORDS[name])]
+
+
+# ================= 工具 (Tools) =================
+
+def get_stock_price_func(symbol: str):
+    """查詢股票即時數據"""
+    try:
+        import yfinance as yf
+        stock = yf.Ticker(symbol)
+        info = stock.info
+        currency = info.get('currency', 'USD')
+        price = info.get('currentPrice') or info.get('regularMarketPrice') or info.get('ask') or 'N/A'
+        pe = info.get('trailingPE', 'N/A')
+        eps = info.get('trailingEps', 'N/A')
+        return f"【{symbol}】現價: {price} {currency}, 本益比(PE): {pe}, EPS: {eps}"
+    except Exception as e:
+        return f"查詢失敗: {e}"
+
+
+def get_google_news_func(query: str):
+    """Google 搜尋 (代碼 / 公司名稱變體並行搜尋，結果去重)"""
+    try:
+        variants = query_variants(query, extract_symbols(query))
+        results = get_news_searcher().search(variants, num_results=3)[:6]
+        output_text = f"【Google 搜尋結果 - {query}】\n"
+        count = 0
+        for r in results:
+            count += 1
+            output_text += f"{count}. {r.title}\n   {r.description}\n\n"
+        if count == 0: return "未搜尋到相關結果。"
+        return output_text
+    except Exception as e:
+        return f"搜尋失敗: {e}"
+
+
+def build_kline_figure(symbol: str):
+    """
+    下載最近 3 個月數據並建立 K 線圖，不碰 UI，可在背景執行緒呼叫。
+    無數據時回傳 None。
+    """
+    import yfinance as yf
+    import plotly.graph_objects as go # 🌟 繪圖神器
+
+    # 用 Ticker.history 而非 yf.download：後者共用全域暫存，多執行緒同時下載會互相覆蓋
+    df = yf.Ticker(symbol).history(period="3mo", interval="1d")
+    if df.empty:
+        return None
+
+    # 建立 Plotly K 線圖
+    fig = go.Figure(data=[go.Candlestick(
+        x=df.index,
+        open=df['Open'],
+        high=df['High'],
+        low=df['Low'],
+        close=df['Close'],
+        name=symbol
+    )])
+
+    fig.update_layout(
+        title=f'{symbol} 近三個月 K 線走勢圖',
+        yaxis_title='股價',
+        xaxis_title='日期',
+        template="plotly_white",
+        height=500
+    )
+    return fig
+
+
+def make_kline_tool(render_chart=None):
+    """Draw_Kline_Chart 工具：建立圖表後交給 render_chart 顯示"""
+    def draw_stock_kline(symbol: str):
+        """
+        繪製股票 K 線圖 (Candlestick Chart)。
+        輸入參數：股票代碼 (如 2330.TW)。
+        """
+        try:
+            fig = build_kline_figure(symbol)
+            if fig is None:
+                return f"無法獲取 {symbol} 的歷史數據，無法繪圖。"
+            if render_chart: render_chart(fig)
+            return f"已成功在畫面上繪製 {symbol} 的 K 線圖，請參考圖表進行趨勢分析。"
+        except Exception as e:
+            return f"繪圖失敗: {e}"
+    return draw_stock_kline
+
+
+def build_tools(rag_func=None, render_chart=None):
+    """🌟 定義工具箱；有上傳文件時才加入 Financial_Report_RAG"""
+    from langchain.agents import Tool
+
+    tools = [
+        Tool(
+            name="Stock_Price",
+            func=get_stock_price_func,
+            description="輸入股票代碼(如 2330.TW)，查詢『即時股價、本益比、EPS』。"
+        ),
+        Tool(
+            name="Google_Search",
+            func=get_google_news_func,
+            description="輸入搜尋關鍵字，查詢『最新新聞、市場動態』。"
+        ),
+        Tool(
+            name="Draw_Kline_Chart",
+            func=make_kline_tool(render_chart),
+            description="輸入股票代碼(如 2330.TW)，『繪製 K 線圖』並顯示在畫面上。"
+        )
+    ]
+    if rag_func:
+        tools.append(
+            Tool(
+                name="Financial_Report_RAG",
+                func=rag_func,
+                description="用於查詢使用者上傳的財報、PDF 文件內容。"
+            )
+        )
+    return tools
+
+
+def build_agent(llm, tools):
+    from langchain.agents import initialize_agent, AgentType
+
+    return initialize_agent(
+        tools,
+        llm,
+        agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=False,
+        handle_parsing_errors=True,
+        agent_kwargs={'prefix': AGENT_PREFIX} # 注入更強的 Prompt
+    )
+
+
+# ================= 並行分析模式 =================
+# 一般的「分析 2330.TW」會依序呼叫 股價 / K 線 / 新聞 / 財報，每個都在等網路 I/O。
+# 並行模式先抓出股票代碼與問題需要的工具，同時呼叫，最後只做一次 LLM 綜合分析 (串流輸出)。
+
+def run_concurrent_analysis(question, symbols, llm, rag_func, handler, render_chart=None, tools=None):
+    """
+    同時呼叫 tools 指定的工具 (預設依 plan_tools 決定)，再串流一次 LLM 綜合分析；回傳最終答案
+    """
+    from agent_runtime import ToolCall, run_tools_concurrently
+
+    if tools is None:
+        tools = plan_tools(question, has_rag=rag_func is not None)
+    calls = []
+    for symbol in symbols:
+        if "Stock_Price" in tools:
+            calls.append(ToolCall("Stock_Price", get_stock_price_func, symbol, TOOL_TIMEOUTS["Stock_Price"]))
+        if "Draw_Kline_Chart" in tools:
+            calls.append(ToolCall("Draw_Kline_Chart", build_kline_figure, symbol, TOOL_TIMEOUTS["Draw_Kline_Chart"]))
+        if "Google_Search" in tools:
+            calls.append(ToolCall("Google_Search", get_google_news_func, f"{symbol} 股票 新聞", TOOL_TIMEOUTS["Google_Search"]))
+    if rag_func and "Financial_Report_RAG" in tools:
+        calls.append(ToolCall("Financial_Report_RAG", rag_func, question, TOOL_TIMEOUTS["Financial_Report_RAG"]))
+
+    def on_result(r):
+        icon = "✅" if r.ok else "⚠️"
+        handler.tool_latency.append((r.name, r.latency))
+        handler.add_step(f"{icon} `{r.name}` ({r.arg[:30]}) {r.latency:.2f}s")
+
+    handler.add_step(f"🚀 同時呼叫 {len(calls)} 個工具...")
+    results = run_tools_concurrently(calls, on_result=on_result)
+
+    observations = []
+    for r in results:
+        text = r.as_text()
+        if r.name == "Draw_Kline_Chart" and r.ok:
+            # 圖表一律在呼叫端執行緒繪製 (Streamlit 元件不能在背景執行緒呼叫)
+            if r.output is None:
+                text = f"無法獲取 {r.arg} 的歷史數據，無法繪圖。"
+            else:
+                if render_chart: render_chart(r.output)
+                text = f"已成功在畫面上繪製 {r.arg} 的 K 線圖。"
+        observations.append(f"### {r.name} ({r.arg})\n{text}")
+
+    handler.add_step("🧠 綜合分析中...")
+    full_analysis = _mentions(question, FULL_ANALYSIS_KEYWORDS)
+    synthesis = SYNTHESIS_PROMPT.format(
+        question=question,
+        observations="\n\n".join(observations),
+        instruction=FULL_ANALYSIS_INSTRUCTION if full_analysis else DIRECT_ANSWER_INSTRUCTION
+    )
+    # 答案以串流回來的 chunk 組成；handler 只負責畫面顯示 (不是每個 provider 都會觸發 on_llm_new_token)
+    parts = []
+    for chunk in llm.stream(synthesis, config={"callbacks": [handler]}):
+        parts.append(_chunk_text(chunk))
+    return "".join(parts)
+
+
+def _chunk_text(chunk):
+    content = getattr(chunk, "content", chunk)
+    if isinstance(content, list):  # 部分 provider 回傳多段內容
+        return "".join(p if isinstance(p, str) else p.get("text", "") for p in content)
+    return str(content)
@@ -0,0 +1,94 @@
+"""
+重量級套件的延遲載入與背景預熱
+
+app.py 以前在畫面出現前就一次 import langchain / FastEmbed / Chroma / yfinance / plotly，
+每個 worker 冷啟動都要付這筆成本，即使大部分 session 根本沒上傳檔案。
+現在各段程式在真正用到時才 import，並在第一次畫面送出後於背景預熱「嵌入模型 + 向量庫」，
+等使用者上傳檔案時通常已經載入完成。
+
+本模組不依賴 streamlit；模組層級的單例在 Streamlit rerun 之間會保留 (sys.modules)。
+"""
+import importlib
+import threading
+import time
+
+# 上傳財報時才需要的套件 (背景預熱的對象)。
+# langchain_community.vectorstores / document_loaders 只是用 __getattr__ 延遲載入的空殼，
+# 要直接 import 實際的子模組與底層套件 (chromadb / pypdf / docx2txt / fastembed) 才算預熱到。
+RAG_MODULES = (
+    "fastembed",
+    "langchain_community.embeddings.fastembed",
+    "chromadb",
+    "langchain_community.vectorstores.chroma",
+    "pypdf",
+    "langchain_community.document_loaders.pdf",
+    "docx2txt",
+    "langchain_community.document_loaders.word_document",
+    "langchain.text_splitter",
+    "langchain.chains",
+)
+
+# 第一次提問時才需要的套件
+AGENT_MODULES = (
+    "langchain.agents",
+    "langchain_google_genai",
+    "langchain_groq",
+    "yfinance",
+    "plotly.graph_objects",
+)
+
+IMPORT_TIMES = {}  # 模組名稱 -> 首次載入耗時 (秒)
+
+_lock = threading.Lock()         # 只保護嵌入模型載入
+_prewarm_lock = threading.Lock()  # 只保護預熱執行緒啟動，不會被模型載入卡住
+_embeddings = None
+_prewarm_thread = None
+
+
+def timed_import(name):
+    """import 並記錄首次載入耗時"""
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES.setdefault(name, time.perf_counter() - t0)
+    return module
+
+
+def get_embeddings():
+    """FastEmbed 模型全 process 只載入一次 (主執行緒與預熱執行緒共用同一把鎖)"""
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            fastembed = timed_import("langchain_community.embeddings.fastembed")
+            _embeddings = fastembed.FastEmbedEmbeddings()
+        return _embeddings
+
+
+def _prewarm():
+    for name in RAG_MODULES:
+        try:
+            timed_import(name)
+        except ImportError:
+            continue  # 缺套件 (例如沒裝 docx2txt) 時交給實際使用的地方回報錯誤
+    try:
+        get_embeddings()
+    except Exception:
+        pass
+    try:
+        # 順便清掉已結束的 worker 留在磁碟上的精簡索引
+        from compact_index import index_root
+        index_root()
+    except Exception:
+        pass
+
+
+def prewarm_rag_stack():
+    """在背景執行緒預熱向量化相關套件與嵌入模型；重複呼叫不會重複啟動"""
+    global _prewarm_thread
+    if _prewarm_thread is not None:
+        return _prewarm_thread
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(target=_prewarm, name="rag-prewarm", daemon=True)
+            _prewarm_thread.start()
+    return _prewarm_thread
+
@@ -0,0 +1,235 @@
+"""
+新聞搜尋層 (給 Google_Search 工具使用)
+
+googlesearch.search 是同步呼叫、沒有 timeout 也沒有快取，搜尋一卡住整輪 Agent 就跟著卡住。
+這裡提供：
+- TTL 快取：以正規化後的查詢字串為 key，幾分鐘內重複搜尋同一檔股票不再打網路
+- 硬性 timeout：超時的查詢不再等待，回傳已拿到的部分結果；晚到的結果仍會寫入快取
+- 多個查詢變體 (代碼 / 英文名 / 中文名) 並行搜尋後去重
+- 所有變體都逾時或失敗時丟出 NewsSearchError，呼叫端可以分辨「沒有新聞」與「搜尋失敗」
+- 可抽換的 backend：測試或 benchmark 時換成本地 StaticNewsBackend，不需連網
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import islice
+
+# 常見台股 / 美股的公司名稱，用來擴充搜尋變體 (代碼 -> [英文名, 中文名])
+COMPANY_ALIASES = {
+    "2330.TW": ["TSMC", "台積電"],
+    "2317.TW": ["Foxconn", "鴻海"],
+    "2454.TW": ["MediaTek", "聯發科"],
+    "2303.TW": ["UMC", "聯電"],
+    "2308.TW": ["Delta Electronics", "台達電"],
+    "2412.TW": ["Chunghwa Telecom", "中華電信"],
+    "2881.TW": ["Fubon Financial", "富邦金"],
+    "2882.TW": ["Cathay Financial", "國泰金"],
+    "2603.TW": ["Evergreen Marine", "長榮海運"],
+    "3711.TW": ["ASE Technology", "日月光投控"],
+    "0050.TW": ["元大台灣50"],
+    "AAPL": ["Apple", "蘋果"],
+    "MSFT": ["Microsoft", "微軟"],
+    "NVDA": ["Nvidia", "輝達"],
+    "GOOGL": ["Alphabet", "Google"],
+    "GOOG": ["Alphabet", "Google"],
+    "AMZN": ["Amazon", "亞馬遜"],
+    "META": ["Meta Platforms", "Meta"],
+    "TSLA": ["Tesla", "特斯拉"],
+    "TSM": ["TSMC ADR", "台積電 ADR"],
+    "AMD": ["AMD", "超微"],
+    "INTC": ["Intel", "英特爾"],
+    "AVGO": ["Broadcom", "博通"],
+    "NFLX": ["Netflix"],
+    "QCOM": ["Qualcomm", "高通"],
+    "ASML": ["ASML"],
+}
+
+
+class NewsSearchError(Exception):
+    """所有查詢變體都逾時或失敗 (與「搜尋成功但沒有結果」不同)"""
+
+    def __init__(self, failures):
+        self.failures = failures  # {查詢: 原因}
+        super().__init__("; ".join(f"{q}: {reason}" for q, reason in failures.items()))
+
+
+@dataclass(frozen=True)
+class NewsItem:
+    title: str
+    description: str = ""
+    url: str = ""
+
+
+def normalize_query(query: str):
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def query_variants(query: str, symbols=(), limit=4):
+    """原始查詢 + 股票代碼對應的公司名稱 (沒有別名時用 "代碼 stock news")，去除重複後最多 limit 個"""
+    variants = [query.strip()]
+    for symbol in symbols:
+        aliases = COMPANY_ALIASES.get(symbol.upper())
+        if aliases:
+            variants.extend(f"{alias} 新聞" for alias in aliases)
+        else:
+            variants.append(f"{symbol.upper()} stock news")
+    seen, unique = set(), []
+    for v in variants:
+        key = normalize_query(v)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(v)
+    return unique[:limit]
+
+
+class GoogleNewsBackend:
+    """預設 backend：googlesearch-python (advanced=True 才有標題與摘要)"""
+
+    def __call__(self, query, num_results):
+        from googlesearch import search as google_search
+        results = google_search(query, num_results=num_results, advanced=True)
+        # search() 是 generator，要在背景執行緒內取完，timeout 才管得到
+        return [
+            NewsItem(title=r.title, description=r.description, url=r.url)
+            for r in islice(results, num_results)
+        ]
+
+
+class StaticNewsBackend:
+    """本地假資料 backend：{查詢: [NewsItem, ...]}，可設定延遲模擬網路"""
+
+    def __init__(self, results=None, latency=0.0):
+        self.results = results or {}
+        self.latency = latency
+        self.calls = []
+
+    def __call__(self, query, num_results):
+        self.calls.append(query)
+        if self.latency: time.sleep(self.latency)
+        return list(self.results.get(query, []))[:num_results]
+
+
+class NewsSearcher:
+    """TTL 快取 + timeout + 並行變體搜尋 (執行緒安全，可跨 session 共用)"""
+
+    def __init__(self, backend=None, ttl=600, timeout=6.0, max_entries=256, max_fanout=4):
+        self.backend = backend or GoogleNewsBackend()
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_entries = max_entries
+        self.max_fanout = max_fanout  # 每次 search 最多同時打幾個變體
+        self._cache = OrderedDict()  # (query, n) -> (expire_at, [NewsItem])
+        self._inflight = {}  # (query, n) -> Future，同一查詢還在跑時直接共用
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "misses": 0, "joined": 0, "timeouts": 0, "errors": 0, "late": 0}
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _cache_get(self, key):
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return None
+            expire_at, results = item
+            if expire_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return results
+
+    def _cache_put(self, key, results):
+        with self._lock:
+            self._cache[key] = (time.monotonic() + self.ttl, results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _on_done(self, key, fut, deadline):
+        """
+        背景搜尋結束時寫入快取 (包含逾時後才回來的結果)。
+        移出 _inflight 與寫入快取在同一次持鎖內完成，其他 search() 不會看到兩邊都沒有而重複打 backend。
+        """
+        ok = not fut.cancelled() and fut.exception() is None
+        with self._lock:
+            self._inflight.pop(key, None)
+            if ok:
+                self._cache_put(key, fut.result())
+                if time.monotonic() > deadline:
+                    self.stats["late"] += 1
+
+    def search(self, queries, num_results=3):
+        """
+        搜尋一個或多個查詢變體，合併去重後回傳 [NewsItem]，保留變體順序。
+        所有變體共用同一個 timeout；逾時或失敗的變體略過，全部失敗時丟出 NewsSearchError。
+        """
+        if isinstance(queries, str):
+            queries = [queries]
+        queries = list(queries)[:self.max_fanout]
+
+        per_query = {}
+        futures = {}
+        submitted = []
+        deadline = time.monotonic() + self.timeout
+        executor = None
+        with self._lock:
+            for q in queries:
+                key = (normalize_query(q), num_results)
+                fut = self._inflight.get(key)
+                if fut is not None:
+                    self.stats["joined"] += 1
+                    futures[fut] = q
+                    continue
+                cached = self._cache_get(key)
+                if cached is not None:
+                    self.stats["hits"] += 1
+                    per_query[q] = cached
+                    continue
+                self.stats["misses"] += 1
+                if executor is None:
+                    # 每次呼叫各自開執行緒：不和其他 session 搶固定大小的池子，也不會在佇列裡耗掉 timeout
+                    executor = ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="news")
+                fut = executor.submit(self.backend, q, num_results)
+                self._inflight[key] = fut
+                futures[fut] = q
+                submitted.append((key, fut))
+        for key, fut in submitted:
+            fut.add_done_callback(lambda f, key=key: self._on_done(key, f, deadline))
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+        failures = {}
+        if futures:
+            done, not_done = wait(futures, timeout=self.timeout)
+            if not_done:
+                self._count("timeouts", len(not_done))
+            for fut in not_done:
+                failures[futures[fut]] = f"逾時 ({self.timeout:g}s)"
+            for fut in done:
+                q = futures[fut]
+                try:
+                    per_query[q] = fut.result()
+                except Exception as e:
+                    self._count("errors")
+                    failures[q] = str(e) or type(e).__name__
+
+        if failures and not per_query:
+            raise NewsSearchError(failures)
+
+        merged, seen = [], set()
+        for q in queries:
+            for item in per_query.get(q, []):
+                key = item.url or normalize_query(item.title)
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(item)
+        return merged
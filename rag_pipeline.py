@@ -0,0 +1,68 @@
+"""
+財報 RAG 流程 (app.py 的上傳 / 向量化 / 問答)
+
+從 app.py 抽出，不依賴 streamlit，benchmark 可以用合成 PDF 直接驅動同一套流程：
+    load_and_split -> build_vector_store -> build_cached_qa
+"""
+import os
+import tempfile
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+
+def load_and_split(files):
+    """
+    讀取並切塊上傳的文件。
+    files: [(檔名, bytes), ...]；只處理 .pdf / .docx，其餘略過。
+    """
+    from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    all_splits = []
+    for file_name, blob in files:
+        file_ext = os.path.splitext(file_name)[1].lower()
+        if file_ext == ".pdf": loader_cls = PyPDFLoader
+        elif file_ext == ".docx": loader_cls = Docx2txtLoader
+        else: continue
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as tmp_file:
+            tmp_file.write(blob)
+            tmp_path = tmp_file.name
+        try:
+            docs = loader_cls(tmp_path).load()
+        finally:
+            os.remove(tmp_path)
+        for d in docs: d.metadata["source"] = file_name  # 來源顯示原始檔名而非暫存路徑
+        all_splits.extend(text_splitter.split_documents(docs))
+    return all_splits
+
+
+def build_vector_store(splits, embeddings, collection_name, compact=False):
+    """建立向量庫：預設 Chroma；compact=True 時改用 int8 memmap 精簡索引"""
+    if compact:
+        from compact_index import CompactVectorIndex
+        return CompactVectorIndex.from_documents(
+            documents=splits,
+            embedding=embeddings
+        )
+    from langchain_community.vectorstores import Chroma
+    return Chroma.from_documents(
+        documents=splits,
+        embedding=embeddings,
+        collection_name=collection_name
+    )
+
+
+def build_cached_qa(llm, vector_db, embeddings, cache, fingerprint, k=5):
+    """RetrievalQA 外包一層語意快取 (以 LLM 名稱分區)，回傳可直接當 Tool func 的 CachedRetrievalQA"""
+    from langchain.chains import RetrievalQA
+    from semantic_cache import CachedRetrievalQA
+
+    qa = RetrievalQA.from_chain_type(
+        llm=llm,
+        retriever=vector_db.as_retriever(search_kwargs={"k": k}),
+        return_source_documents=True
+    )
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", "")
+    return CachedRetrievalQA(qa, embeddings, cache, fingerprint, model=f"{type(llm).__name__}:{model}")
@@ -0,0 +1,228 @@
+"""
+語意快取 (Semantic Answer Cache)
+
+分析師常對同一批財報重複提出幾乎相同的問題，每次都會觸發一次檢索 + 一次完整的 LLM 呼叫。
+這裡在 Financial_Report_RAG 工具前面加一層快取：
+- 以已載入的 FastEmbed 模型將問題向量化
+- 只在「同一份文件集指紋 (fingerprint) + 同一個 LLM」內比對相似問題
+- 相似度過門檻之外，問題中的數字 / 期間 / 財報指標 / 代碼也必須完全相同
+  (「Q2 2023 營收」與「Q3 2023 營收」、「第二季營收」與「第二季毛利」向量幾乎一樣，但答案不能互用)
+- 命中時直接回傳先前的答案與來源段落
+- LRU 淘汰；文件集變動時以 invalidate() 清除舊指紋
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+
+def collection_fingerprint(file_blobs, chunk_size=800, chunk_overlap=150, model_name=""):
+    """
+    計算文件集指紋。
+    file_blobs: [(檔名, bytes), ...]，與上傳順序無關。
+    切塊參數與嵌入模型也納入指紋，任一改變都視為不同的文件集。
+    """
+    h = hashlib.sha256()
+    h.update(f"{chunk_size}:{chunk_overlap}:{model_name}".encode("utf-8"))
+    for name, blob in sorted(file_blobs, key=lambda x: x[0]):
+        h.update(name.encode("utf-8"))
+        h.update(hashlib.sha256(blob).digest())
+    return h.hexdigest()[:16]
+
+
+_CN_DIGITS = {"一": "1", "二": "2", "三": "3", "四": "4"}
+_PERIOD = re.compile(r"(?<![A-Za-z])(?:FY\s?(\d{2,4})|([QH])([1-4])|第([一二三四1-4])季|([上下])半年)(?![A-Za-z0-9])", re.IGNORECASE)
+# 財報指標 (同義詞 -> 同一個標記)；「Q2 營收」與「Q2 毛利」向量很接近，答案卻完全不同
+METRIC_TERMS = {
+    "revenue": ("營收", "營業收入", "銷售額", "revenue", "sales"),
+    "gross_margin": ("毛利率", "gross margin"),
+    "gross_profit": ("毛利", "gross profit"),
+    "operating_margin": ("營業利益率", "營益率", "operating margin"),
+    "operating_income": ("營業利益", "營益", "operating income", "operating profit"),
+    "net_margin": ("淨利率", "net margin"),
+    "net_income": ("稅後淨利", "淨利", "net income", "net profit", "earnings"),
+    "EPS": ("每股盈餘", "eps"),
+    "PE": ("本益比", "p/e"),
+    "free_cash_flow": ("自由現金流", "free cash flow"),
+    "cash_flow": ("現金流", "cash flow"),
+    "capex": ("資本支出", "capital expenditure", "capex"),
+    "dividend": ("股利", "配息", "dividend", "dividends"),
+    "debt": ("負債", "debt", "liabilities"),
+    "inventory": ("存貨", "庫存", "inventory"),
+    "expenses": ("費用", "expense", "expenses", "opex"),
+    "cost": ("成本", "cost", "costs"),
+}
+_METRIC_BY_TERM = {term.lower(): metric for metric, terms in METRIC_TERMS.items() for term in terms}
+# 長的詞先比對 (毛利率 要先於 毛利)；英文詞前後不能接字母
+_METRIC = re.compile(
+    "|".join(
+        re.escape(t) if not t.isascii() else rf"(?<![A-Za-z]){re.escape(t)}(?![A-Za-z])"
+        for t in sorted(_METRIC_BY_TERM, key=len, reverse=True)
+    ),
+    re.IGNORECASE,
+)
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*%?")
+_SYMBOL = re.compile(r"(?<![A-Za-z])[A-Z]{2,5}(?![A-Za-z])")
+
+
+def question_key(question: str):
+    """
+    問題中會改變答案的字詞：期間 (Q2 / 第二季 / 上半年 / FY2023)、財報指標 (營收 / 毛利 / EPS)、
+    數字、大寫代碼 (NVDA)。語意相似但這些字詞不同的問題不能共用答案。
+    """
+    tokens = set()
+
+    def metric(m):
+        tokens.add(_METRIC_BY_TERM[m.group(0).lower()])
+        return " "
+
+    def period(m):
+        fy, qh, n, cn_q, half = m.groups()
+        if fy: tokens.add(f"FY{fy}")
+        elif qh: tokens.add(f"{qh.upper()}{n}")
+        elif cn_q: tokens.add(f"Q{_CN_DIGITS.get(cn_q, cn_q)}")
+        else: tokens.add("H1" if half == "上" else "H2")
+        return " "
+
+    text = _METRIC.sub(metric, _PERIOD.sub(period, question))
+    tokens.update(n.replace(",", "") for n in _NUMBER.findall(text))
+    tokens.update(_SYMBOL.findall(text))
+    return frozenset(tokens)
+
+
+def _normalize(vector):
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else v
+
+
+@dataclass
+class CacheEntry:
+    fingerprint: str
+    question: str
+    vector: np.ndarray
+    answer: str
+    sources: list = field(default_factory=list)
+    model: str = ""
+    key: frozenset = frozenset()
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+@dataclass
+class CacheHit:
+    entry: CacheEntry
+    similarity: float
+
+
+class SemanticAnswerCache:
+    """以文件集指紋 + LLM 分區、LRU 淘汰的語意快取 (執行緒安全)"""
+
+    def __init__(self, max_entries=512, threshold=0.95):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._entries = OrderedDict()  # key -> CacheEntry，越後面越新
+        self._lock = threading.Lock()
+        self._next_key = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, fingerprint, vector, question="", model=""):
+        """
+        找出同一指紋、同一 LLM、且 question_key 相同的問題中最相似的一筆；
+        相似度未達門檻則回傳 None
+        """
+        q = _normalize(vector)
+        key_tokens = question_key(question)
+        with self._lock:
+            keys = [
+                k for k, e in self._entries.items()
+                if e.fingerprint == fingerprint and e.model == model and e.key == key_tokens
+            ]
+            if not keys:
+                self.stats["misses"] += 1
+                return None
+            matrix = np.vstack([self._entries[k].vector for k in keys])
+            scores = matrix @ q
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.stats["misses"] += 1
+                return None
+            key = keys[best]
+            entry = self._entries[key]
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return CacheHit(entry=entry, similarity=float(scores[best]))
+
+    def store(self, fingerprint, question, vector, answer, sources=None, model=""):
+        entry = CacheEntry(
+            fingerprint=fingerprint,
+            question=question,
+            vector=_normalize(vector),
+            answer=answer,
+            sources=list(sources or []),
+            model=model,
+            key=question_key(question),
+        )
+        with self._lock:
+            self._entries[self._next_key] = entry
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def invalidate(self, fingerprint=None):
+        """清除指定文件集的快取 (所有 LLM)；不給指紋則全部清空。回傳刪除筆數"""
+        with self._lock:
+            if fingerprint is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            stale = [k for k, e in self._entries.items() if e.fingerprint == fingerprint]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+
+class CachedRetrievalQA:
+    """
+    包裝 RetrievalQA，讓 Tool(func=...) 可直接使用。
+    qa 需以 return_source_documents=True 建立；model 為產生答案的 LLM 名稱，不同 LLM 的答案不共用。
+    最近一次查詢的結果放在 last_hit / last_sources，供 UI 顯示來源段落。
+    """
+
+    def __init__(self, qa, embeddings, cache, fingerprint, model=""):
+        self.qa = qa
+        self.embeddings = embeddings
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.model = model
+        self.last_hit = None
+        self.last_sources = []
+
+    def run(self, question: str):
+        vector = self.embeddings.embed_query(question)
+        hit = self.cache.lookup(self.fingerprint, vector, question, self.model)
+        if hit is not None:
+            self.last_hit = hit
+            self.last_sources = hit.entry.sources
+            return hit.entry.answer
+
+        result = self.qa.invoke({"query": question})
+        answer = result["result"]
+        sources = [
+            {"content": d.page_content, "metadata": dict(d.metadata)}
+            for d in result.get("source_documents", [])
+        ]
+        self.cache.store(self.fingerprint, question, vector, answer, sources, self.model)
+        self.last_hit = None
+        self.last_sources = sources
+        return answer
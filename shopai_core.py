@@ -0,0 +1,193 @@
+"""
+ShopAI 核心邏輯 (資料庫 + Text-to-SQL + 數據解讀)
+
+從 streamlit_app.py 抽出，不依賴 streamlit，client / conn 由呼叫端傳入。
+UI 與 benchmark (benchmarks/bench_e2e.py) 共用同一套 generate_sql → execute_sql_safe → generate_human_response。
+"""
+import sqlite3
+from itertools import islice
+
+import pandas as pd
+
+MODEL = "llama-3.3-70b-versatile"
+
+PRODUCTS_DATA = [
+    ("BEV-001", "可口可樂 600ml", "飲料", 35, 20, 120, 50, "太古可樂", "正常", "2024-01-01"),
+    ("BEV-002", "原萃綠茶", "飲料", 25, 15, 200, 80, "太古可樂", "正常", "2024-01-02"),
+    ("BEV-003", "瑞穗全脂鮮乳", "飲料", 92, 75, 0, 12, "統一企業", "缺貨", "2023-12-28"),
+    ("BEV-004", "貝納頌咖啡", "飲料", 35, 22, 45, 15, "味全食品", "正常", "2024-01-03"),
+    ("BEV-005", "舒跑運動飲料", "飲料", 25, 16, 150, 40, "維他露", "正常", "2024-01-01"),
+    ("BEV-006", "OATLY燕麥奶", "飲料", 169, 130, 12, 5, "德記洋行", "補貨中", "2023-12-30"),
+    ("BEV-007", "純喫茶紅茶", "飲料", 20, 14, 80, 60, "統一企業", "正常", "2024-01-04"),
+    ("BEV-008", "每朝健康綠茶", "飲料", 35, 23, 60, 20, "維他露", "正常", "2024-01-02"),
+    ("BEV-009", "紅牛能量飲料", "飲料", 59, 40, 200, 10, "紅牛台灣", "正常", "2024-01-01"),
+    ("BEV-010", "統一木瓜牛乳", "飲料", 35, 25, 5, 25, "統一企業", "補貨中", "2023-12-29"),
+    ("FRE-001", "御飯糰(鮪魚)", "鮮食", 35, 20, 12, 40, "統一超食", "正常", "2024-01-05"),
+    ("FRE-002", "所長茶葉蛋", "鮮食", 18, 10, 0, 150, "所長食品", "缺貨", "2024-01-04"),
+    ("FRE-003", "台灣香蕉(根)", "鮮食", 25, 12, 5, 30, "在地農會", "補貨中", "2024-01-03"),
+    ("FRE-004", "奮起湖便當", "鮮食", 89, 65, 8, 20, "統一超食", "正常", "2024-01-05"),
+    ("FRE-005", "即食雞胸肉", "鮮食", 59, 35, 25, 15, "大成食品", "正常", "2024-01-04"),
+    ("FRE-006", "大亨堡熱狗", "熟食", 35, 18, 15, 30, "統一超食", "正常", "2024-01-05"),
+    ("FRE-007", "關東煮(總合)", "熟食", 15, 8, 0, 50, "統一超食", "缺貨", "2024-01-04"),
+    ("FRE-008", "溫泉蛋", "鮮食", 25, 15, 30, 25, "石安牧場", "正常", "2024-01-03"),
+    ("SNK-001", "樂事洋芋片", "零食", 45, 30, 80, 25, "百事食品", "正常", "2023-12-25"),
+    ("SNK-002", "義美小泡芙", "零食", 32, 22, 100, 45, "義美食品", "正常", "2023-12-20"),
+    ("SNK-003", "金莎巧克力", "零食", 42, 28, 5, 60, "費列羅", "補貨中", "2023-12-15"),
+    ("SNK-004", "科學麵", "零食", 12, 6, 500, 200, "統一企業", "正常", "2023-12-10"),
+    ("SNK-005", "萬歲牌綜合堅果", "零食", 150, 100, 20, 10, "聯華食品", "正常", "2023-12-01"),
+    ("SNK-006", "北海鱈魚香絲", "零食", 50, 35, 60, 15, "有豐食品", "正常", "2023-12-22"),
+    ("DAL-001", "舒潔衛生紙", "日用品", 129, 90, 60, 20, "金百利", "正常", "2023-11-20"),
+    ("DAL-002", "金頂電池(3號)", "日用品", 159, 100, 30, 5, "金頂", "正常", "2023-10-15"),
+    ("DAL-003", "輕便雨衣", "日用品", 49, 20, 150, 50, "達新工業", "正常", "2023-09-01"),
+    ("DAL-004", "醫療口罩(50入)", "日用品", 199, 120, 100, 10, "中衛", "正常", "2023-12-01"),
+    ("ALC-001", "金牌台灣啤酒", "酒類", 45, 30, 200, 60, "台灣菸酒", "正常", "2023-12-31"),
+    ("ALC-002", "海尼根", "酒類", 55, 38, 180, 50, "海尼根", "正常", "2023-12-30"),
+    ("ALC-003", "約翰走路黑牌", "酒類", 850, 600, 3, 2, "帝亞吉歐", "缺貨", "2023-11-15"),
+    ("TOB-001", "七星(中淡)", "香菸", 125, 90, 300, 100, "杰太日煙", "正常", "2024-01-01"),
+    ("TOB-002", "麥瑟(藍)", "香菸", 110, 80, 20, 5, "帝國菸草", "補貨中", "2023-12-28"),
+]
+
+# 🌟 定義欄位中英對照表 (UI 顯示用)
+COLUMN_MAPPING = {
+    "sku": "商品編號",
+    "name": "商品名稱",
+    "category": "類別",
+    "price": "單價",
+    "cost": "成本",
+    "stock": "庫存量",
+    "sales_7d": "近7日銷量",
+    "supplier": "供應商",
+    "status": "狀態",
+    "last_restock": "最後補貨日",
+    "margin": "毛利"
+}
+
+CREATE_TABLE_SQL = '''
+    CREATE TABLE products (
+        sku TEXT PRIMARY KEY,
+        name TEXT, category TEXT, price INTEGER, cost INTEGER, stock INTEGER, 
+        sales_7d INTEGER, supplier TEXT, status TEXT, last_restock DATE
+    )
+'''
+
+
+def create_db(products=None, batch_size=50000):
+    """
+    建立 in-memory 商品資料庫。
+    products 預設為內建的示範商品；benchmark 可傳入大型合成目錄 (任意 iterable，分批寫入)。
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    c = conn.cursor()
+    c.execute(CREATE_TABLE_SQL)
+    rows = iter(PRODUCTS_DATA if products is None else products)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        c.executemany('INSERT INTO products VALUES (?,?,?,?,?,?,?,?,?,?)', batch)
+    conn.commit()
+    return conn
+
+
+DB_SCHEMA = """
+Table: products
+Columns: 
+- sku (商品編號)
+- name (商品名稱)
+- category (類別)
+- price (零售價)
+- cost (進貨成本)
+- stock (庫存量)
+- sales_7d (過去7天銷售量)
+- supplier (供應商名稱)
+- status ('正常', '缺貨', '補貨中')
+- last_restock (最後進貨日)
+
+Logic:
+1. Margin (毛利) = price - cost
+2. Inventory Value = cost * stock
+3. High Risk = stock < sales_7d (Inventory days < 7)
+"""
+
+def generate_sql(client, query, error_msg=None):
+    if not client: return None
+    instruction = ""
+    if error_msg:
+        instruction = f"\n⚠️ PREVIOUS SQL FAILED: {error_msg}. FIX IT."
+    
+    system_prompt = f"""
+    You are a SQLite expert. Schema: {DB_SCHEMA}
+    Rules:
+    1. Output ONLY valid SQL. No markdown.
+    2. Use `LIKE` for fuzzy search.
+    3. 'Out of stock' = status='缺貨' OR stock=0.
+    {instruction}
+    """
+    try:
+        completion = client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": query}],
+            temperature=0.1, max_tokens=200
+        )
+        return completion.choices[0].message.content.strip().replace("```sql", "").replace("```", "")
+    except:
+        return None
+
+def execute_sql_safe(client, conn, sql, user_query):
+    try:
+        return pd.read_sql_query(sql, conn), None
+    except Exception as e:
+        new_sql = generate_sql(client, user_query, error_msg=str(e))
+        if new_sql:
+            try:
+                return pd.read_sql_query(new_sql, conn), new_sql
+            except Exception as e2:
+                return None, f"Retry failed: {e2}"
+        return None, str(e)
+
+def generate_human_response(client, user_query, df, error=None):
+    if not client: return "⚠️ 演示模式：請設定 API Key 以啟用 AI 分析功能。"
+    
+    if error:
+        return f"⚠️ 系統無法理解您的查詢。(Error: {error})"
+    if df is None or df.empty:
+        data_context = "查詢結果：無資料。"
+    else:
+        if 'price' in df.columns and 'cost' in df.columns:
+            df['margin'] = df['price'] - df['cost']
+        
+        df_display = df.rename(columns=COLUMN_MAPPING)
+        data_context = f"查詢結果 (前 10 筆):\n{df_display.head(10).to_string(index=False)}"
+
+    system_prompt = f"""
+    【角色設定】
+    你是一位「資深零售營運總監」的 AI 特助。
+    你的對話對象是公司老闆，他關注「毛利」、「庫存周轉」、「資金積壓」與「供應鏈穩定」。
+
+    【當前任務】
+    根據數據：
+    {data_context}
+    
+    回答老闆的問題："{user_query}"
+
+    【回答準則 - Boss Mode】
+    1. **結論先行 (BLUF)**：第一句話直接講重點。
+    2. **財務視角**：
+       - 不只報庫存，要報「庫存金額」。
+       - 提到商品時，若有數據，請順帶分析毛利。
+    3. **行動建議 (Actionable Insights)**：
+       - 發現缺貨：請列出該商品的「供應商」並建議立即聯絡。
+       - 發現滯銷：建議促銷。
+       - 發現熱銷：發出斷貨預警。
+    4. **語氣**：專業、精煉、決策導向。不要用客服語氣。
+    5. **格式**：不使用 Markdown 表格，用條列式呈現。
+    """
+    try:
+        completion = client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "system", "content": system_prompt}],
+            temperature=0.7, max_tokens=450
+        )
+        return completion.choices[0].message.content
+    except:
+        return "系統忙碌中..."
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 專案沒有打包，測試直接 import 根目錄與 benchmarks/ 的模組
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+sys.path.insert(0, str(ROOT))
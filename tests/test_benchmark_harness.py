@@ -0,0 +1,58 @@
+import pytest
+
+pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import shopai_core as core  # noqa: E402
+from bench_e2e import StageRecorder  # noqa: E402
+from fixtures import synthetic_catalog, synthetic_pdf_corpus  # noqa: E402
+from stub_llm_server import BROKEN_SQL, StubLLMConfig, StubLLMServer  # noqa: E402
+
+
+def _fast_config(**kwargs):
+    return StubLLMConfig(latency=0.0, tokens_per_sec=1e6, **kwargs)
+
+
+def test_create_db_loads_synthetic_catalog_in_batches():
+    conn = core.create_db(synthetic_catalog(1234, seed=1), batch_size=100)
+    assert conn.execute("SELECT COUNT(*) FROM products").fetchone()[0] == 1234
+
+
+def test_execute_sql_safe_self_corrects_against_stub_llm():
+    groq = pytest.importorskip("groq")
+    conn = core.create_db()
+    with StubLLMServer(_fast_config(sql_error_rate=1.0)) as server:
+        client = groq.Groq(api_key="stub", base_url=server.base_url, max_retries=0)
+
+        sql = core.generate_sql(client, "缺貨清單")
+        assert sql == BROKEN_SQL
+        df, new_sql = core.execute_sql_safe(client, conn, sql, "缺貨清單")
+
+        assert new_sql and new_sql != BROKEN_SQL
+        assert not df.empty and set(df["name"]) >= {"瑞穗全脂鮮乳", "所長茶葉蛋"}
+        assert server.requests == 2  # 第一次 SQL + 一次修正
+
+
+def test_synthetic_pdf_corpus_goes_through_load_and_split():
+    pytest.importorskip("pypdf")
+    pytest.importorskip("langchain_community")
+    from rag_pipeline import load_and_split
+
+    corpus = synthetic_pdf_corpus(2, pages=2, lines_per_page=30, seed=3)
+    splits = load_and_split(corpus)
+
+    assert len(splits) > 2
+    assert {d.metadata["source"] for d in splits} == {name for name, _ in corpus}
+    assert all("year over year" in d.page_content for d in splits)
+
+
+def test_stage_recorder_keeps_failures_out_of_percentiles():
+    recorder = StageRecorder()
+    with recorder.stage("ok"):
+        pass
+    with pytest.raises(RuntimeError):
+        with recorder.stage("ok"):
+            raise RuntimeError("boom")
+
+    summary = recorder.summary()
+    assert summary["ok"]["n"] == 1 and summary["ok:error"]["n"] == 1
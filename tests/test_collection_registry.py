@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from collection_registry import EVICTED, EXPIRED, RELEASED, CollectionRegistry, CollectionTooLargeError
+
+
+class FakeStore:
+    def __init__(self):
+        self.deleted = False
+
+    def delete_collection(self):
+        self.deleted = True
+
+
+def test_removal_reasons():
+    registry = CollectionRegistry(max_collections=2)
+    registry.register("s1", "a", FakeStore(), vectors=10, dim=4)
+    registry.register("s2", "b", FakeStore(), vectors=10, dim=4)
+    registry.register("s3", "c", FakeStore(), vectors=10, dim=4)
+    assert registry.removal_reason("a") == EVICTED
+
+    registry.release_session("s2")
+    assert registry.removal_reason("b") == RELEASED
+
+    registry.expire(now=time.time() + 2 * registry.session_ttl)
+    assert registry.removal_reason("c") == EXPIRED
+    assert registry.removal_reason("never-registered") is None
+
+
+def test_reupload_deletes_old_collection_but_keeps_fingerprint_in_use():
+    seen = []
+    registry = CollectionRegistry(on_delete=lambda e: seen.append(registry.fingerprint_in_use(e.fingerprint)))
+    old = FakeStore()
+    registry.register("s1", "a", old, vectors=10, dim=4, fingerprint="F")
+    registry.register("s1", "a2", FakeStore(), vectors=10, dim=4, fingerprint="F")
+
+    assert old.deleted and not registry.is_alive("a")
+    assert seen == [True]
+
+
+def test_fingerprint_released_by_last_session():
+    registry = CollectionRegistry()
+    registry.register("s1", "a", FakeStore(), vectors=10, dim=4, fingerprint="F")
+    registry.register("s2", "b", FakeStore(), vectors=10, dim=4, fingerprint="F")
+
+    registry.release_session("s1")
+    assert registry.fingerprint_in_use("F")
+    registry.release_session("s2")
+    assert not registry.fingerprint_in_use("F")
+
+
+def test_oversized_collection_is_rejected_without_evicting_others():
+    registry = CollectionRegistry(max_bytes=1024)
+    others = [FakeStore() for _ in range(3)]
+    for i, store in enumerate(others):
+        registry.register(f"s{i}", f"c{i}", store, vectors=10, dim=4)
+
+    huge = FakeStore()
+    with pytest.raises(CollectionTooLargeError):
+        registry.register("big", "huge", huge, vectors=10_000, dim=1)
+
+    assert huge.deleted and not registry.is_alive("huge")
+    assert not any(s.deleted for s in others)
+    assert registry.stats()["collections"] == 3 and registry.evictions == 0
+    assert registry.estimate_bytes(10_000, 1) > registry.max_bytes
+
+
+def test_store_is_dropped_outside_the_registry_lock():
+    registry = CollectionRegistry()
+    release_started, finish_delete = threading.Event(), threading.Event()
+
+    class SlowStore(FakeStore):
+        def delete_collection(self):
+            release_started.set()
+            finish_delete.wait(2)  # 模擬等待其他 session 的查詢結束
+
+    registry.register("s1", "slow", SlowStore(), vectors=10, dim=4)
+    releaser = threading.Thread(target=registry.release_session, args=("s1",))
+    releaser.start()
+    release_started.wait(2)
+
+    t0 = time.perf_counter()
+    registry.touch("s2")
+    registry.expire()
+    assert time.perf_counter() - t0 < 0.5
+    assert not registry.is_alive("slow")
+
+    finish_delete.set()
+    releaser.join()
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("langchain_core")
+
+from langchain_core.documents import Document  # noqa: E402
+
+from compact_index import CompactVectorIndex, IndexClosedError, cleanup_stale_indexes  # noqa: E402
+
+
+class FixedEmbedding:
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0, 0.0]
+
+
+def _index(tmp_path):
+    vectors = np.eye(4, dtype=np.float32)
+    docs = [Document(page_content=f"chunk {i}", metadata={"i": i}) for i in range(4)]
+    return CompactVectorIndex.from_vectors(vectors, docs, directory=str(tmp_path / "idx"), embedding=FixedEmbedding())
+
+
+def test_search_after_delete_raises_clear_error(tmp_path):
+    index = _index(tmp_path)
+    assert index.similarity_search("q", k=1)[0].page_content == "chunk 0"
+
+    index.delete_collection()
+    assert not os.path.exists(index.directory)
+    with pytest.raises(IndexClosedError):
+        index.similarity_search("q", k=1)
+    index.delete_collection()  # 重複刪除不報錯
+
+
+def test_delete_waits_for_inflight_search(tmp_path):
+    index = _index(tmp_path)
+    original = index._search_batch
+    started = threading.Event()
+
+    def slow_search(*args):
+        started.set()
+        time.sleep(0.2)
+        return original(*args)
+
+    index._search_batch = slow_search
+    results = []
+    reader = threading.Thread(target=lambda: results.append(index.similarity_search("q", k=1)))
+    reader.start()
+    started.wait()
+    index.delete_collection()
+    reader.join()
+
+    assert results[0][0].page_content == "chunk 0"
+    assert not os.path.exists(index.directory)
+
+
+def test_cleanup_removes_only_dead_process_dirs(tmp_path):
+    dead = tmp_path / "pid-4999999"  # 超過 Linux 預設 pid_max
+    alive = tmp_path / f"pid-{os.getpid()}"
+    other = tmp_path / "not-an-index"
+    for d in (dead, alive, other):
+        d.mkdir()
+
+    assert cleanup_stale_indexes(str(tmp_path)) == 1
+    assert not dead.exists() and alive.exists() and other.exists()
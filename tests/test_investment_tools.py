@@ -0,0 +1,79 @@
+import pytest
+
+from investment_tools import extract_symbols, plan_tools
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Should I buy NVDA?", ["NVDA"]),
+    ("Is TSMC a BUY or SELL now", []),
+    ("P/E of AAPL vs MSFT", ["AAPL", "MSFT"]),
+    ("畫出 2330.TW 的走勢圖並分析", ["2330.TW"]),
+    ("6488.TWO 與 2330.TW 比較", ["6488.TWO", "2330.TW"]),
+    ("$pltr 股價多少", ["PLTR"]),
+    ("BRK.B price", ["BRK.B"]),
+    ("AI 概念股的 EPS 與 ROE", []),
+])
+def test_extract_symbols(question, expected):
+    assert extract_symbols(question) == expected
+
+
+def test_extract_symbols_dedup_and_limit():
+    assert extract_symbols("NVDA NVDA AAPL MSFT TSLA") == ["NVDA", "AAPL", "MSFT"]
+
+
+def test_price_question_only_fetches_price():
+    assert plan_tools("NVDA 現在股價多少？", has_rag=True) == ["Stock_Price"]
+
+
+def test_analysis_question_uses_every_tool():
+    assert plan_tools("分析 2330.TW", has_rag=True) == [
+        "Stock_Price", "Draw_Kline_Chart", "Google_Search", "Financial_Report_RAG",
+    ]
+    assert "Financial_Report_RAG" not in plan_tools("分析 2330.TW", has_rag=False)
+
+
+def test_english_keywords_match_whole_words():
+    assert plan_tools("open the NVDA steps") == []
+    assert plan_tools("NVDA news and P/E") == ["Stock_Price", "Google_Search"]
+
+
+@pytest.mark.parametrize("question", ["NVDA 在地圖上的據點", "NVDA 的意圖是什麼", "AAPL 企圖進軍車市", "TSLA 的擴廠計畫"])
+def test_chart_not_triggered_by_unrelated_words(question):
+    assert "Draw_Kline_Chart" not in plan_tools(question)
+
+
+@pytest.mark.parametrize("question", ["畫出 NVDA 走勢圖", "AAPL K線圖", "幫我畫圖 2330.TW"])
+def test_chart_requested(question):
+    assert plan_tools(question) == ["Draw_Kline_Chart"]
+
+
+class _Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class _StreamingLLM:
+    def stream(self, prompt, config=None):
+        yield _Chunk("NVDA ")
+        yield _Chunk([{"type": "text", "text": "現價 "}, "100 USD"])
+
+
+class _QuietHandler:
+    """不會收到 on_llm_new_token 的 handler，text 還留著上一輪的內容"""
+
+    def __init__(self):
+        self.tool_latency = []
+        self.text = "上一輪的答案"
+
+    def add_step(self, step):
+        pass
+
+
+def test_concurrent_analysis_answer_comes_from_stream(monkeypatch):
+    import investment_tools
+
+    monkeypatch.setattr(investment_tools, "get_stock_price_func", lambda symbol: f"{symbol} 100 USD")
+    answer = investment_tools.run_concurrent_analysis(
+        "NVDA 股價", ["NVDA"], _StreamingLLM(), None, _QuietHandler(), tools=["Stock_Price"]
+    )
+    assert answer == "NVDA 現價 100 USD"
@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from lazy_deps import AGENT_MODULES, RAG_MODULES
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# app.py 在第一次畫面前會 import 的模組
+STARTUP_MODULES = ("lazy_deps", "collection_registry", "investment_tools", "news_search")
+HEAVY_ROOTS = ("langchain", "langchain_core", "langchain_community", "chromadb", "fastembed", "pypdf",
+               "yfinance", "plotly", "numpy")
+
+
+def test_startup_modules_do_not_load_heavy_dependencies():
+    # 在全新的子行程量測：本行程可能已被其他測試 import 過 langchain
+    code = (
+        "import json, sys\n"
+        f"for name in {STARTUP_MODULES!r}: __import__(name)\n"
+        "print(json.dumps(sorted(sys.modules)))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT, check=True)
+    loaded = set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    assert not loaded & set(RAG_MODULES + AGENT_MODULES)
+    assert not {m for m in loaded if m.split(".")[0] in HEAVY_ROOTS}
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from news_search import NewsItem, NewsSearchError, NewsSearcher, StaticNewsBackend, query_variants
+
+
+def _item(n, url=None):
+    return NewsItem(title=f"title {n}", description=f"desc {n}", url=url if url is not None else f"https://x/{n}")
+
+
+def test_cache_hit_within_ttl():
+    backend = StaticNewsBackend({"TSMC": [_item(1)]})
+    searcher = NewsSearcher(backend, ttl=60)
+
+    assert searcher.search("TSMC") == [_item(1)]
+    assert searcher.search("  tsmc ") == [_item(1)]  # 正規化後同一個 key
+    assert backend.calls == ["TSMC"]
+    assert searcher.stats["hits"] == 1
+
+
+def test_cache_entry_expires_after_ttl():
+    backend = StaticNewsBackend({"TSMC": [_item(1)]})
+    searcher = NewsSearcher(backend, ttl=0.05)
+
+    searcher.search("TSMC")
+    time.sleep(0.1)
+    searcher.search("TSMC")
+    assert backend.calls == ["TSMC", "TSMC"]
+
+
+def test_variants_are_merged_and_deduplicated():
+    shared = _item(1, url="https://x/shared")
+    backend = StaticNewsBackend({
+        "2330.TW": [shared, _item(2)],
+        "TSMC 新聞": [_item(3), shared],
+        "台積電 新聞": [NewsItem(title="title 2", url="https://x/2")],
+    })
+    searcher = NewsSearcher(backend)
+
+    results = searcher.search(query_variants("2330.TW", ["2330.TW"]))
+    assert [r.url for r in results] == ["https://x/shared", "https://x/2", "https://x/3"]
+
+
+def test_items_without_url_dedup_by_title():
+    backend = StaticNewsBackend({"a": [_item(1, url="")], "b": [NewsItem(title=" Title 1 ")]})
+    assert len(NewsSearcher(backend).search(["a", "b"])) == 1
+
+
+def test_us_ticker_variants():
+    assert query_variants("NVDA 股票 新聞", ["NVDA"]) == ["NVDA 股票 新聞", "Nvidia 新聞", "輝達 新聞"]
+    assert query_variants("XYZ", ["XYZ"]) == ["XYZ", "XYZ stock news"]
+
+
+def test_fanout_is_bounded_per_call():
+    backend = StaticNewsBackend()
+    NewsSearcher(backend, max_fanout=2).search(["a", "b", "c", "d"])
+    assert sorted(backend.calls) == ["a", "b"]
+
+
+def test_timeout_raises_and_late_result_is_cached():
+    backend = StaticNewsBackend({"slow": [_item(1)]}, latency=0.3)
+    searcher = NewsSearcher(backend, timeout=0.05)
+
+    with pytest.raises(NewsSearchError) as exc:
+        searcher.search("slow")
+    assert "slow" in exc.value.failures
+    assert searcher.stats["timeouts"] == 1
+
+    time.sleep(0.4)
+    assert searcher.search("slow") == [_item(1)]
+    assert backend.calls == ["slow"]
+    assert searcher.stats["late"] == 1
+
+
+def test_concurrent_callers_share_inflight_search():
+    backend = StaticNewsBackend({"q": [_item(1)]}, latency=0.2)
+    searcher = NewsSearcher(backend, timeout=2)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(searcher.search("q"))) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    assert results == [[_item(1)]] * 4
+    assert backend.calls == ["q"]
+
+
+def test_partial_timeout_returns_available_results():
+    class MixedBackend(StaticNewsBackend):
+        def __call__(self, query, num_results):
+            if query == "slow": time.sleep(0.3)
+            return [_item(query)]
+
+    searcher = NewsSearcher(MixedBackend(), timeout=0.1)
+    assert searcher.search(["fast", "slow"]) == [_item("fast")]
+
+
+def test_backend_error_is_distinct_from_no_results():
+    class BrokenBackend:
+        def __call__(self, query, num_results):
+            raise RuntimeError("429 Too Many Requests")
+
+    with pytest.raises(NewsSearchError, match="429"):
+        NewsSearcher(BrokenBackend()).search("TSMC")
+    assert NewsSearcher(StaticNewsBackend()).search("TSMC") == []
+
+
+def test_no_duplicate_backend_call_between_inflight_and_cache():
+    backend = StaticNewsBackend({"q": [_item(1)]}, latency=0.05)
+
+    class Probe(NewsSearcher):
+        probe = None
+
+        def _cache_put(self, key, results):
+            # 在寫入快取的當下從另一個執行緒搜尋同一查詢：不能出現「兩邊都查不到」的空窗
+            if self.probe is None:
+                self.probe = threading.Thread(target=self.search, args=("q",))
+                self.probe.start()
+                self.probe.join(0.1)
+            super()._cache_put(key, results)
+
+    searcher = Probe(backend, timeout=2)
+    assert searcher.search("q") == [_item(1)]
+    searcher.probe.join()
+    assert backend.calls == ["q"]
@@ -0,0 +1,70 @@
+from semantic_cache import CachedRetrievalQA, SemanticAnswerCache, question_key
+
+VEC = [1.0, 0.0, 0.0]
+
+
+class ConstantEmbeddings:
+    """所有問題都得到同一個向量：只靠 question_key / model 分辨能不能命中"""
+
+    def embed_query(self, text):
+        return VEC
+
+
+class CountingQA:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, inputs):
+        self.calls += 1
+        return {"result": f"answer {self.calls} for {inputs['query']}", "source_documents": []}
+
+
+def test_question_key_normalizes_periods():
+    assert question_key("Q2 2023 revenue") == question_key("2023 第二季 營收")
+    assert question_key("Q2 2023 revenue") != question_key("Q3 2023 revenue")
+    assert question_key("NVDA EPS") != question_key("AMD EPS")
+    assert question_key("毛利率 1,200") == frozenset({"1200", "gross_margin"})
+
+
+def test_question_key_separates_metrics():
+    assert question_key("2023 第二季營收") != question_key("2023 第二季毛利")
+    assert question_key("2023 第二季毛利") != question_key("2023 第二季毛利率")
+    assert question_key("Q2 2023 revenue") == question_key("2023 第二季營收")
+    assert question_key("NVDA EPS") == question_key("NVDA 每股盈餘")
+
+
+def test_metric_mismatch_is_a_miss_even_with_identical_vectors():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("F", "2023 第二季營收", VEC, "revenue answer")
+
+    assert cache.lookup("F", VEC, "2023 第二季毛利") is None
+    assert cache.lookup("F", VEC, "2023 年第二季的營收是多少").entry.answer == "revenue answer"
+
+
+def test_hit_requires_same_numbers_and_tickers():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("F", "Q2 2023 revenue", VEC, "q2 answer")
+
+    assert cache.lookup("F", VEC, "What was revenue in Q2 2023?").entry.answer == "q2 answer"
+    assert cache.lookup("F", VEC, "Q3 2023 revenue") is None
+    assert cache.lookup("F", VEC, "Q2 2024 revenue") is None
+
+
+def test_partitioned_by_model_and_fingerprint():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("F", "營收", VEC, "gemini answer", model="gemini")
+
+    assert cache.lookup("F", VEC, "營收", model="gemini") is not None
+    assert cache.lookup("F", VEC, "營收", model="groq") is None
+    assert cache.lookup("G", VEC, "營收", model="gemini") is None
+    assert cache.invalidate("F") == 1
+
+
+def test_cached_retrieval_qa_only_reuses_matching_question():
+    qa = CountingQA()
+    cached = CachedRetrievalQA(qa, ConstantEmbeddings(), SemanticAnswerCache(threshold=0.9), "F", model="groq")
+
+    first = cached.run("Q2 2023 revenue")
+    assert cached.run("Q2 2023 revenue?") == first and cached.last_hit is not None
+    assert cached.run("Q3 2023 revenue") != first and cached.last_hit is None
+    assert qa.calls == 2